@@ -5,21 +5,104 @@ import pyautogui
 import time
 import math
 import numpy as np
+import os
+import queue
+import threading
+from collections import namedtuple
 
-# --- MediaPipe Face Mesh Setup ---
-mp_face_mesh = mp.solutions.face_mesh
+try:
+    from numba import njit
+except ImportError:
+    # Optional dependency: without Numba the ratio kernel runs as plain Python (same results, slower)
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+try:
+    from pynput.keyboard import Controller as KeyboardController, Key
+except ImportError:
+    KeyboardController = None  # Optional dependency: without pynput, keys are sent through pyautogui
+
+# Preview window with landmarks and status text; ACCESSI_SHOW_UI=0 runs headless (quit with Ctrl+C)
+SHOW_UI = os.environ.get("ACCESSI_SHOW_UI", "1") != "0"
+
+# pyautogui sleeps PAUSE (0.1 s) after every call by default, which blocks this frame loop on each key event
+pyautogui.PAUSE = 0
+
+# --- Key Backend ---
+# pynput sends each event straight to the OS input API; pyautogui adds its own failsafe/pause bookkeeping per call
+if KeyboardController is not None:
+    keyboard = KeyboardController()
+    PYNPUT_KEYS = {'shift': Key.shift, 'space': Key.space}  # pyautogui key names that aren't single characters
+
+    def key_down(key):
+        keyboard.press(PYNPUT_KEYS.get(key, key))
+
+    def key_up(key):
+        keyboard.release(PYNPUT_KEYS.get(key, key))
+else:
+    key_down = pyautogui.keyDown
+    key_up = pyautogui.keyUp
+
+# --- MediaPipe Face Landmark Setup ---
+# If the Tasks model file is present, FaceLandmarker runs the landmark CNN on the GPU delegate;
+# otherwise (or if GPU init fails) the CPU FaceMesh solution is used as before
+FACE_LANDMARKER_MODEL = "face_landmarker.task"
 
-face_mesh = mp_face_mesh.FaceMesh(
-    max_num_faces=1,
-    refine_landmarks=True,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5)
+def create_face_landmarker():
+    try:
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python.vision import FaceLandmarker, FaceLandmarkerOptions, RunningMode
+        options = FaceLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=FACE_LANDMARKER_MODEL, delegate=BaseOptions.Delegate.GPU),
+            running_mode=RunningMode.VIDEO,
+            num_faces=1,
+            min_face_detection_confidence=0.5,
+            min_tracking_confidence=0.5)
+        return FaceLandmarker.create_from_options(options)
+    except Exception as e:
+        print(f"WARN: FaceLandmarker (GPU) unavailable: {e}. Using FaceMesh.")
+        return None
+
+face_landmarker = create_face_landmarker() if os.path.exists(FACE_LANDMARKER_MODEL) else None
+face_mesh = None
+if face_landmarker is None:
+    face_mesh = mp.solutions.face_mesh.FaceMesh(
+        max_num_faces=1,
+        refine_landmarks=False, # Iris/lip refinement (landmarks 468-477) is a second model pass; no index used here is >= 468
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5)
+last_timestamp_ms = 0
+
+def detect_face_landmarks(rgb_frame):
+    """Returns the first face's landmark list (indexable, with .x/.y/.z) or None"""
+    global last_timestamp_ms
+    if face_landmarker is not None:
+        # VIDEO mode requires strictly increasing timestamps
+        last_timestamp_ms = max(last_timestamp_ms + 1, int(time.monotonic() * 1000))
+        result = face_landmarker.detect_for_video(mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame), last_timestamp_ms)
+        return result.face_landmarks[0] if result.face_landmarks else None
+    results = face_mesh.process(rgb_frame)
+    return results.multi_face_landmarks[0].landmark if results.multi_face_landmarks else None
 
 # --- Camera and Screen Setup ---
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+CAMERA_FPS = 30         # Every captured frame costs a MediaPipe pass; blink/tilt thresholds are counted in frames at ~30 FPS
+CAMERA_BUFFER_SIZE = 1  # Don't queue stale frames behind the one being processed
+CAMERA_FOURCC = 'MJPG'  # Compressed over USB instead of raw YUYV, so the requested size/FPS fit the bus
+
 cap = cv2.VideoCapture(0)
 if not cap.isOpened():
     print("Error: Cannot open camera")
     exit()
+# Drivers default to whatever they like (often 1280x720); these are requests, unsupported ones are ignored
+cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*CAMERA_FOURCC))  # Before the size: V4L2 picks sizes per format
+cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+cap.set(cv2.CAP_PROP_FPS, CAMERA_FPS)
+cap.set(cv2.CAP_PROP_BUFFERSIZE, CAMERA_BUFFER_SIZE)
 
 screen_w, screen_h = pyautogui.size()
 
@@ -42,6 +125,8 @@ mouth_open_state = False
 eyebrows_raised_state = False
 head_tilt_left_state = False
 head_tilt_right_state = False
+both_eyes_closed_state = False
+avg_err = 0.0
 
 
 # --- Blink detection variables ---
@@ -60,8 +145,22 @@ keys_currently_pressed = set()  # Track which keys are currently being pressed
 # --- Thresholds ---
 EAR_THRESHOLD = 0.20
 MAR_THRESHOLD = 0.35
+MAR_THRESHOLD_SQ = MAR_THRESHOLD ** 2  # MAR is compared squared (v^2 > t^2 * h^2 form), so its sqrt is never taken
 ERR_THRESHOLD = 1.34  # Eyebrow Raise Ratio threshold (adjust based on testing)
 BOTH_EYES_CLOSED_FRAMES = 2  # Number of consecutive frames to detect both eyes closed
+DETECTION_WIDTH = 320  # FaceMesh input width; landmarks are normalized, so drawing on the full frame is unchanged
+# Motion gating: when the grayscale thumbnail differs from the one of the last inferred frame by less than this
+# (mean abs difference, 0-255), the previous landmarks are reused instead of running the model. e.g. 1.5;
+# 0 disables it (the default, as in FacialDetector): a blink moves few enough pixels to fall under the threshold
+MOTION_SKIP_THRESHOLD = 0.0
+MOTION_SKIP_MAX_REUSE = 30  # Run the model at least every N frames regardless
+MOTION_THUMB_SIZE = (160, 120)
+STATUS_OVERLAY_HEIGHT = 320  # Rows of the preview covered by the status text (last baseline at y=300)
+# Idle subsampling: while no counter is mid-gesture and no key is held, the model runs on every Nth frame, e.g. 2;
+# 1 disables it (the default, like motion gating): a blink starting on a skipped frame is seen a frame late, and
+# short blinks can then miss CONSEC_FRAMES_BLINK. The first closed-eye reading switches back to every frame
+INFERENCE_IDLE_STRIDE = 1
+MIN_INFER_INTERVAL_MS = 0  # When subsampling, infer at least this often even if idle, e.g. 66 (~15 Hz) for head tilt
 
 # New head tilt thresholds
 HEAD_TILT_LEFT_MIN = -100  # Start pressing 'A' when angle is below -100
@@ -76,85 +175,76 @@ CONSEC_FRAMES_HEAD_TILT = 2  # Number of consecutive frames for head tilt detect
 
 
 # --- Counters ---
-left_blink_counter = 0
-right_blink_counter = 0
+# Blink histories: bit i is set if the eye was closed i frames ago. The eye counts as closed once the last
+# CONSEC_FRAMES_BLINK frames all were, i.e. the masked history is all ones (same as the old reset-on-open counter)
+BLINK_HISTORY_MASK = (1 << CONSEC_FRAMES_BLINK) - 1
+left_blink_history = 0
+right_blink_history = 0
 mouth_open_counter = 0
 eyebrow_raise_counter = 0
 head_tilt_left_counter = 0
 head_tilt_right_counter = 0
 both_eyes_closed_counter = 0  # Counter for both eyes closed
 
-def calculate_distance(p1, p2):
-    return math.sqrt((p1.x - p2.x)**2 + (p1.y - p2.y)**2 + (p1.z - p2.z)**2)
-
-def calculate_ear(eye_landmarks):
+# Every landmark the loop reads, gathered into one (28, 3) array per frame. Rows: 0-5 left eye, 6-11 right eye,
+# 12-13 mouth corners, 14-15 inner lips, 16-20 left eyebrow, 21-25 right eyebrow (0-25 = LANDMARKS_TO_DRAW),
+# 26 chin, 27 forehead
+POINT_INDICES = LANDMARKS_TO_DRAW + [152, 10]
+NUM_DRAWN_POINTS = len(LANDMARKS_TO_DRAW)
+CHIN_ROW = 26
+FOREHEAD_ROW = 27
+# Row pairs whose distances the ratios need: per eye (p1-p5, p2-p4, p0-p3), eyebrow middle-outer widths,
+# then mouth horizontal, vertical
+RATIO_PAIRS_A = np.array([1, 2, 0, 7, 8, 6, 18, 23, 12, 14])
+RATIO_PAIRS_B = np.array([5, 4, 3, 11, 10, 9, 20, 25, 13, 15])
+
+# Ratio distances are 3D (x, y, z) on the normalized landmark coordinates. FacialDetector's kernel
+# (detectors/_facial_kernels.py) uses 2D (x, y) on the same normalized coordinates, so neither is pixel-based
+# and the thresholds don't carry over between the two
+@njit(cache=True)
+def face_features_kernel(points, pairs_a, pairs_b, frame_width, frame_height):
+    """(EAR left, EAR right, MAR squared, ERR left, ERR right, head tilt) from the gathered POINT_INDICES array"""
+    sq = np.empty(10)
+    for k in range(10):
+        a = pairs_a[k]
+        b = pairs_b[k]
+        dx = points[a, 0] - points[b, 0]
+        dy = points[a, 1] - points[b, 1]
+        dz = points[a, 2] - points[b, 2]
+        sq[k] = dx * dx + dy * dy + dz * dz
+    # EAR sums lengths and ERR divides by one, so those need square roots; MAR is compared squared
+    d0 = math.sqrt(sq[0]); d1 = math.sqrt(sq[1]); d2 = math.sqrt(sq[2])
+    d3 = math.sqrt(sq[3]); d4 = math.sqrt(sq[4]); d5 = math.sqrt(sq[5])
+    d6 = math.sqrt(sq[6]); d7 = math.sqrt(sq[7])
+    ear_left = (d3 + d4) / (2.0 * d5) if d5 != 0.0 else 1.0
+    ear_right = (d0 + d1) / (2.0 * d2) if d2 != 0.0 else 1.0
+    mar_sq = sq[9] / sq[8] if sq[8] != 0.0 else 0.0
+    # ERR: eyebrow middle to top of the eye below it (vertical only), over the eyebrow's middle-outer width
+    err_left = abs(points[pairs_a[6], 1] - points[7, 1]) / d6 if d6 != 0.0 else 0.0
+    err_right = abs(points[pairs_a[7], 1] - points[1, 1]) / d7 if d7 != 0.0 else 0.0
+    # Head tilt: angle of the chin-to-forehead line from vertical, in degrees. Scaled to pixels so a non-square
+    # frame doesn't skew it
+    dx = (points[FOREHEAD_ROW, 0] - points[CHIN_ROW, 0]) * frame_width
+    dy = (points[FOREHEAD_ROW, 1] - points[CHIN_ROW, 1]) * frame_height
+    head_tilt = math.degrees(math.atan2(dx, dy))
+    return ear_left, ear_right, mar_sq, err_left, err_right, head_tilt
+
+def gather_points(landmarks):
+    """Reads the POINT_INDICES landmarks into one (N, 3) array, the only per-landmark attribute access per frame"""
     try:
-        v1 = calculate_distance(eye_landmarks[1], eye_landmarks[5])
-        v2 = calculate_distance(eye_landmarks[2], eye_landmarks[4])
-        h = calculate_distance(eye_landmarks[0], eye_landmarks[3])
-        if h == 0: return 1.0
-        ear = (v1 + v2) / (2.0 * h)
-        return ear
+        return np.array([(p.x, p.y, p.z) for p in map(landmarks.__getitem__, POINT_INDICES)])
     except IndexError:
-        return 1.0
+        return None
 
-def calculate_mar(landmarks, corner_indices, inner_vertical_indices):
-    try:
-        mouth_left_corner = landmarks[corner_indices[0]]
-        mouth_right_corner = landmarks[corner_indices[1]]
-        lip_upper_inner = landmarks[inner_vertical_indices[0]]
-        lip_lower_inner = landmarks[inner_vertical_indices[1]]
-        vertical_dist = calculate_distance(lip_upper_inner, lip_lower_inner)
-        horizontal_dist = calculate_distance(mouth_left_corner, mouth_right_corner)
-        if horizontal_dist == 0: return 0
-        mar = vertical_dist / horizontal_dist
-        return mar
-    except IndexError:
-        return 0
-
-def calculate_err(landmarks, eyebrow_indices, eye_indices):
-    """Calculate Eyebrow Raise Ratio (ERR)"""
-    try:
-        # Get eyebrow points (middle and outer points)
-        eyebrow_middle = landmarks[eyebrow_indices[2]]
-        eyebrow_outer = landmarks[eyebrow_indices[4]]
-        
-        # Get corresponding eye points (top of the eye)
-        eye_top = landmarks[eye_indices[1]]
-        
-        # Calculate vertical distance between eyebrow and eye
-        vertical_dist = abs(eyebrow_middle.y - eye_top.y)
-        
-        # Calculate horizontal distance between eyebrow points
-        horizontal_dist = calculate_distance(eyebrow_middle, eyebrow_outer)
-        
-        if horizontal_dist == 0: return 0
-        err = vertical_dist / horizontal_dist
-        return err
-    except IndexError:
-        return 0
+def calculate_face_features(points, frame_width, frame_height):
+    """Returns (EAR left, EAR right, MAR squared, ERR left, ERR right, head tilt angle in degrees) for the face.
+    Left/right are the person's (mirrored frame): the left EAR comes from RIGHT_EYE_INDICES."""
+    if points is None:
+        return 1.0, 1.0, 0, 0, 0, 0
+    return face_features_kernel(points, RATIO_PAIRS_A, RATIO_PAIRS_B, frame_width, frame_height)
 
-def calculate_head_tilt(landmarks, frame_width, frame_height):
-    """Calculate head tilt angle in degrees"""
-    try:
-        # Get face oval points (chin and forehead)
-        chin = landmarks[152]
-        forehead = landmarks[10]
-        
-        # Convert to pixel coordinates
-        chin_x = int(chin.x * frame_width)
-        chin_y = int(chin.y * frame_height)
-        forehead_x = int(forehead.x * frame_width)
-        forehead_y = int(forehead.y * frame_height)
-        
-        # Calculate the angle between vertical line and face line
-        dx = forehead_x - chin_x
-        dy = forehead_y - chin_y
-        angle = math.degrees(math.atan2(dx, dy))
-        
-        return angle
-    except IndexError:
-        return 0
+# Compile now (or load from the on-disk cache) so the first detected face doesn't stall on the JIT
+face_features_kernel(np.ones((len(POINT_INDICES), 3)), RATIO_PAIRS_A, RATIO_PAIRS_B, 640, 480)
 
 def update_keys(actions_to_perform):
     """
@@ -166,33 +256,144 @@ def update_keys(actions_to_perform):
     
     for key, should_press in actions_to_perform.items():
         if should_press and key not in keys_currently_pressed:
-            pyautogui.keyDown(key)
+            key_down(key)
             keys_currently_pressed.add(key)
             print(f"Pressed: {key}")
         elif not should_press and key in keys_currently_pressed:
-            pyautogui.keyUp(key)
+            key_up(key)
             keys_currently_pressed.remove(key)
             print(f"Released: {key}")
 
 def perform_shift_key_combo(key):
     """Perform a single shift+key press and release"""
-    pyautogui.keyDown(key)
-    pyautogui.keyDown('shift')
-    pyautogui.keyDown(key)
+    key_down(key)
+    key_down('shift')
+    key_down(key)
     time.sleep(0.05)  # Small delay to ensure the key combination is registered
-    pyautogui.keyUp(key)
-    pyautogui.keyUp('shift')
+    key_up(key)
+    key_up('shift')
     print(f"Single press: shift+{key}")
 
 def release_all_keys():
     """Release all keys that are currently pressed"""
     global keys_currently_pressed
     for key in list(keys_currently_pressed):
-        pyautogui.keyUp(key)
+        key_up(key)
         print(f"Released: {key}")
     keys_currently_pressed.clear()
 
-print("Starting Facial Controller. Press 'q' to quit.")
+# --- Pipeline ---
+# Three stages overlap: the capture thread decodes frame N+1 while the main thread runs inference on frame N
+# and the render thread draws and shows frame N-1. Each queue holds one item and a producer replaces an
+# item that hasn't been taken yet, so no stage ever works on (or blocks behind) a stale frame.
+RenderState = namedtuple('RenderState', [
+    'ear_left', 'ear_right', 'mar_sq', 'avg_err', 'head_tilt_angle',
+    'left_eye_closed', 'right_eye_closed', 'mouth_open', 'eyebrows_raised',
+    'head_tilt_left', 'head_tilt_right', 'both_eyes_closed', 'active_keys',
+    'left_blink_recent', 'right_blink_recent'])
+
+stop_event = threading.Event()
+raw_frames = queue.Queue(maxsize=1)   # Mirrored BGR frames from the camera (None: capture stopped)
+render_jobs = queue.Queue(maxsize=1)  # (frame, points, RenderState) for the preview (None: stop rendering)
+
+def put_latest(q, item):
+    """Puts item into a size-1 queue, replacing the one the consumer hasn't taken yet"""
+    try:
+        q.put_nowait(item)
+    except queue.Full:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(item)  # Each queue has a single producer, so the slot is still free
+
+def capture_loop():
+    """Reader stage: grabs and mirrors camera frames"""
+    while not stop_event.is_set():
+        ret, frame = cap.read()
+        if not ret:
+            print("Failed to grab frame")
+            time.sleep(0.5)
+            continue
+        if frame.shape[1] > CAMERA_WIDTH:  # The driver ignored the size request; don't carry the extra pixels downstream
+            frame = cv2.resize(frame, (CAMERA_WIDTH, frame.shape[0] * CAMERA_WIDTH // frame.shape[1]), interpolation=cv2.INTER_AREA)
+        put_latest(raw_frames, cv2.flip(frame, 1))
+    put_latest(raw_frames, None)
+
+def status_lines(state):
+    """The preview's status text as a tuple of (text, origin, scale, color, thickness) for cv2.putText"""
+    left_eye_color = (0, 0, 255) if state.left_eye_closed else (0, 255, 0)
+    right_eye_color = (0, 0, 255) if state.right_eye_closed else (0, 255, 0)
+    mouth_color = (0, 0, 255) if state.mouth_open else (0, 255, 0)
+    eyebrow_color = (0, 0, 255) if state.eyebrows_raised else (0, 255, 0)
+    head_tilt_left_color = (0, 0, 255) if state.head_tilt_left else (0, 255, 0)
+    head_tilt_right_color = (0, 0, 255) if state.head_tilt_right else (0, 255, 0)
+    both_eyes_color = (0, 0, 255) if state.both_eyes_closed else (0, 255, 0)
+
+    lines = [
+        (f"L EYE: {state.ear_left:.2f} ({'Closed' if state.left_eye_closed else 'Open'})", (10, 30), 0.6, left_eye_color, 2),
+        (f"R EYE: {state.ear_right:.2f} ({'Closed' if state.right_eye_closed else 'Open'})", (10, 60), 0.6, right_eye_color, 2),
+        (f"MAR: {math.sqrt(state.mar_sq):.2f} ({'Open' if state.mouth_open else 'Closed'})", (10, 90), 0.6, mouth_color, 2),
+        (f"ERR: {state.avg_err:.2f} ({'Raised' if state.eyebrows_raised else 'Normal'})", (10, 120), 0.6, eyebrow_color, 2),
+        (f"Head Tilt: {state.head_tilt_angle:.1f}° ({'Left' if state.head_tilt_left else 'Right' if state.head_tilt_right else 'Center'})", (10, 150),
+         0.6, head_tilt_left_color if state.head_tilt_left else head_tilt_right_color if state.head_tilt_right else (0, 255, 0), 2),
+        (f"Both Eyes: {'Closed' if state.both_eyes_closed else 'Open'}", (10, 180), 0.6, both_eyes_color, 2),
+    ]
+
+    # Display active keys
+    active_keys_text = "Active Keys: " + ", ".join(state.active_keys) if state.active_keys else "No keys active"
+    lines.append((active_keys_text, (10, 210), 0.6, (255, 255, 255), 2))
+
+    # Display blink feedback
+    if state.left_blink_recent:
+        lines.append(("Left eye blink: 'shift+a' pressed", (10, 240), 0.6, (255, 215, 0), 2))
+    if state.right_blink_recent:
+        lines.append(("Right eye blink: 'shift+d' pressed", (10, 270), 0.6, (255, 215, 0), 2))
+
+    # Display thresholds for reference
+    lines.append((f"Head Tilt Left: {HEAD_TILT_LEFT_MIN}° to {HEAD_TILT_LEFT_MAX}° | Right: {HEAD_TILT_RIGHT_MIN}° to {HEAD_TILT_RIGHT_MAX}°", (10, 300),
+                  0.5, (200, 200, 200), 1))
+    return tuple(lines)
+
+def render_loop():
+    """Writer stage: draws landmarks and status onto processed frames and shows them; 'q' stops the pipeline"""
+    overlay = overlay_mask = overlay_lines = None
+    while True:
+        job = render_jobs.get()
+        if job is None:
+            break
+        frame, points, state = job
+        frame_height, frame_width, _ = frame.shape
+
+        if points is not None:
+            # Pixel coordinates for all drawn points in one array op (astype truncates like int() did)
+            pixels = (points[:, :2] * (frame_width, frame_height)).astype(np.int32)
+            # Each point as a zero-length segment of thickness 4: one call draws the same pixels as a filled
+            # radius-2 cv2.circle per point
+            cv2.polylines(frame, pixels[:NUM_DRAWN_POINTS, None, :].repeat(2, axis=1), False, (0, 255, 0), 4)
+
+            # Draw head tilt line
+            cv2.line(frame, tuple(pixels[CHIN_ROW].tolist()), tuple(pixels[FOREHEAD_ROW].tolist()), (255, 0, 0), 2)
+
+        # Status text only changes when a displayed value or state does; it is rasterized into a cached
+        # overlay on those frames and copied through its mask on all the others
+        lines = status_lines(state)
+        if overlay is None or overlay.shape[1] != frame_width or lines != overlay_lines:
+            overlay = np.zeros((min(STATUS_OVERLAY_HEIGHT, frame_height), frame_width, 3), dtype=np.uint8)
+            for text, origin, scale, color, thickness in lines:
+                cv2.putText(overlay, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+            overlay_mask = overlay.any(axis=2).view(np.uint8)  # Every status color is non-black
+            overlay_lines = lines
+        cv2.copyTo(overlay, overlay_mask, frame[:overlay.shape[0]])
+
+        cv2.imshow('Facial Gesture Controller', frame)
+
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            stop_event.set()
+    cv2.destroyAllWindows()  # From the thread that owns the window
+
+print(f"Starting Facial Controller. Press {'q' if SHOW_UI else 'Ctrl+C'} to quit.")
 print("Blink left eye for 'shift+a', right eye for 'shift+d'.")
 print("Hold eyebrows raised for 'j' key.")
 print(f"Tilt head left ({HEAD_TILT_LEFT_MIN}° to {HEAD_TILT_LEFT_MAX}°) for 'a' key.")
@@ -200,32 +401,77 @@ print(f"Tilt head right ({HEAD_TILT_RIGHT_MIN}° to {HEAD_TILT_RIGHT_MAX}°) for
 print("Open mouth for SPACE key.")
 print("You can combine actions (e.g., tilt head AND open mouth).")
 
+small_buf = None  # Downscaled BGR frame
+rgb_buf = None    # Its RGB conversion, fed to the landmark model
+inferred_thumb = None  # Grayscale thumbnail of the last frame the model actually ran on
+landmarks = None
+reuse_count = 0
+last_infer_time = 0.0
+
+capture_thread = threading.Thread(target=capture_loop, name="FacialControllerCapture", daemon=True)
+capture_thread.start()
+render_thread = None
+if SHOW_UI:
+    render_thread = threading.Thread(target=render_loop, name="FacialControllerRender", daemon=True)
+    render_thread.start()
+
 try:
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Failed to grab frame")
-            time.sleep(0.5)
+    # Processor stage (main thread): inference, the gesture state machine and the key presses
+    while not stop_event.is_set():
+        try:
+            frame = raw_frames.get(timeout=0.5)  # Timeout keeps Ctrl+C and the 'q' stop responsive
+        except queue.Empty:
             continue
+        if frame is None:
+            break
 
-        frame = cv2.flip(frame, 1)
         frame_height, frame_width, _ = frame.shape
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        rgb_frame.flags.writeable = False
-        results = face_mesh.process(rgb_frame)
-        rgb_frame.flags.writeable = True
-
-        frame = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR)
+        # FaceMesh runs on a downscaled RGB copy; frame itself stays BGR for drawing and display.
+        # The resize and RGB buffers are allocated once and rewritten in place (dst=) every frame
+        if frame_width > DETECTION_WIDTH:
+            detect_size = (DETECTION_WIDTH, frame_height * DETECTION_WIDTH // frame_width)
+        else:
+            detect_size = (frame_width, frame_height)
+        if rgb_buf is None or rgb_buf.shape[1::-1] != detect_size:
+            small_buf = np.empty((detect_size[1], detect_size[0], 3), dtype=np.uint8)
+            rgb_buf = np.empty_like(small_buf)
+        if detect_size != (frame_width, frame_height):
+            small_frame = cv2.resize(frame, detect_size, dst=small_buf, interpolation=cv2.INTER_AREA)
+        else:
+            small_frame = frame
+        if MOTION_SKIP_THRESHOLD > 0:
+            thumb = cv2.resize(cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY), MOTION_THUMB_SIZE, interpolation=cv2.INTER_AREA)
+            static = (inferred_thumb is not None and landmarks is not None and reuse_count < MOTION_SKIP_MAX_REUSE and
+                      cv2.absdiff(thumb, inferred_thumb).mean() < MOTION_SKIP_THRESHOLD)
+        else:
+            static = False
+        if not static and INFERENCE_IDLE_STRIDE > 1 and landmarks is not None:
+            idle = not (left_blink_history or right_blink_history or mouth_open_counter or eyebrow_raise_counter or
+                        head_tilt_left_counter or head_tilt_right_counter or both_eyes_closed_counter or keys_currently_pressed)
+            static = (idle and reuse_count < INFERENCE_IDLE_STRIDE - 1 and
+                      (time.monotonic() - last_infer_time) * 1000 < MIN_INFER_INTERVAL_MS)
+
+        if static:
+            reuse_count += 1  # Reuse the previous landmarks
+        else:
+            rgb_buf.flags.writeable = True
+            cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB, dst=rgb_buf)
+
+            rgb_buf.flags.writeable = False
+            landmarks = detect_face_landmarks(rgb_buf)
+            reuse_count = 0
+            last_infer_time = time.monotonic()
+            if MOTION_SKIP_THRESHOLD > 0:
+                inferred_thumb = thumb
 
         ear_left_val = 1.0
         ear_right_val = 1.0
-        mar_val = 0.0
+        mar_sq_val = 0.0
         err_left_val = 0.0
         err_right_val = 0.0
         head_tilt_angle = 0.0
         
-        current_time = time.time()
+        current_time = time.monotonic() # Cooldowns only need intervals; immune to wall-clock (NTP) jumps
         
         # Dictionary to track which keys should be pressed or released
         actions = {
@@ -239,45 +485,33 @@ try:
         # Reset blink flags
         left_eye_blinked = False
         right_eye_blinked = False
+        points = None
 
-        if results.multi_face_landmarks:
-            landmarks = results.multi_face_landmarks[0].landmark
+        if landmarks is not None:
 
-            person_right_eye_points = [landmarks[i] for i in LEFT_EYE_INDICES]
-            person_left_eye_points = [landmarks[i] for i in RIGHT_EYE_INDICES]
-
-            ear_left_val = calculate_ear(person_left_eye_points)
-            ear_right_val = calculate_ear(person_right_eye_points)
+            points = gather_points(landmarks)
+            ear_left_val, ear_right_val, mar_sq_val, err_left_val, err_right_val, head_tilt_angle = calculate_face_features(
+                points, frame_width, frame_height)
 
             # Left eye blink detection (person's right eye)
-            if ear_left_val < EAR_THRESHOLD:
-                left_blink_counter += 1
-                left_eye_closed_state = left_blink_counter >= CONSEC_FRAMES_BLINK
-                
-                # Detect transition from open to closed for left eye blink
-                if left_eye_closed_state and not left_eye_previously_closed and current_time - last_left_blink_time > blink_cooldown:
-                    left_eye_blinked = True
-                    last_left_blink_time = current_time
-                left_eye_previously_closed = left_eye_closed_state
-            else:
-                left_blink_counter = 0
-                left_eye_closed_state = False
-                left_eye_previously_closed = False
+            left_blink_history = ((left_blink_history << 1) | (ear_left_val < EAR_THRESHOLD)) & BLINK_HISTORY_MASK
+            left_eye_closed_state = left_blink_history == BLINK_HISTORY_MASK
+
+            # Detect transition from open to closed for left eye blink
+            if left_eye_closed_state and not left_eye_previously_closed and current_time - last_left_blink_time > blink_cooldown:
+                left_eye_blinked = True
+                last_left_blink_time = current_time
+            left_eye_previously_closed = left_eye_closed_state
 
             # Right eye blink detection (person's left eye)
-            if ear_right_val < EAR_THRESHOLD:
-                right_blink_counter += 1
-                right_eye_closed_state = right_blink_counter >= CONSEC_FRAMES_BLINK
-                
-                # Detect transition from open to closed for right eye blink
-                if right_eye_closed_state and not right_eye_previously_closed and current_time - last_right_blink_time > blink_cooldown:
-                    right_eye_blinked = True
-                    last_right_blink_time = current_time
-                right_eye_previously_closed = right_eye_closed_state
-            else:
-                right_blink_counter = 0
-                right_eye_closed_state = False
-                right_eye_previously_closed = False
+            right_blink_history = ((right_blink_history << 1) | (ear_right_val < EAR_THRESHOLD)) & BLINK_HISTORY_MASK
+            right_eye_closed_state = right_blink_history == BLINK_HISTORY_MASK
+
+            # Detect transition from open to closed for right eye blink
+            if right_eye_closed_state and not right_eye_previously_closed and current_time - last_right_blink_time > blink_cooldown:
+                right_eye_blinked = True
+                last_right_blink_time = current_time
+            right_eye_previously_closed = right_eye_closed_state
 
             # Process detected blinks - only if ONE eye blinks, not both
             if left_eye_blinked and not right_eye_blinked:
@@ -286,9 +520,7 @@ try:
                 perform_shift_key_combo('d')
 
             # Mouth open detection (press 'k')
-            mar_val = calculate_mar(landmarks, MOUTH_CORNER_INDICES, MOUTH_VERTICAL_INDICES)
-
-            if mar_val > MAR_THRESHOLD:
+            if mar_sq_val > MAR_THRESHOLD_SQ:
                 mouth_open_counter += 1
             else:
                 mouth_open_counter = max(0, mouth_open_counter - 1)
@@ -308,8 +540,6 @@ try:
                 actions['space'] = True
 
             # Eyebrow raise detection
-            err_left_val = calculate_err(landmarks, LEFT_EYEBROW_INDICES, RIGHT_EYE_INDICES)
-            err_right_val = calculate_err(landmarks, RIGHT_EYEBROW_INDICES, LEFT_EYE_INDICES)
             avg_err = (err_left_val + err_right_val) / 2
 
             if avg_err > ERR_THRESHOLD:
@@ -321,9 +551,7 @@ try:
             if eyebrows_raised_state:
                 actions['j'] = True
 
-            # Head tilt detection with new thresholds
-            head_tilt_angle = calculate_head_tilt(landmarks, frame_width, frame_height)
-            
+            # Head tilt detection with new thresholds (angle computed with the ratios above)
             # Check if head tilt is in the left range (-100 to -160)
             if HEAD_TILT_LEFT_MIN >= head_tilt_angle >= HEAD_TILT_LEFT_MAX:
                 head_tilt_left_counter += 1
@@ -344,81 +572,27 @@ try:
             elif head_tilt_right_state:
                 actions['d'] = True
 
-            # Visualization
-            for index in LANDMARKS_TO_DRAW:
-                try:
-                    point = landmarks[index]
-                    x = int(point.x * frame_width)
-                    y = int(point.y * frame_height)
-                    cv2.circle(frame, (x, y), 2, (0, 255, 0), -1)
-                except IndexError:
-                    pass
-
-            # Draw head tilt line
-
-            try:
-                chin = landmarks[152]
-                forehead = landmarks[10]
-                chin_x = int(chin.x * frame_width)
-                chin_y = int(chin.y * frame_height)
-                forehead_x = int(forehead.x * frame_width)
-                forehead_y = int(forehead.y * frame_height)
-                cv2.line(frame, (chin_x, chin_y), (forehead_x, forehead_y), (255, 0, 0), 2)
-            except IndexError:
-                pass
-
         # Update keys based on current actions
         update_keys(actions)
 
-        # Display status
-        left_eye_color = (0, 0, 255) if left_eye_closed_state else (0, 255, 0)
-        right_eye_color = (0, 0, 255) if right_eye_closed_state else (0, 255, 0)
-        mouth_color = (0, 0, 255) if mouth_open_state else (0, 255, 0)
-        eyebrow_color = (0, 0, 255) if eyebrows_raised_state else (0, 255, 0)
-        head_tilt_left_color = (0, 0, 255) if head_tilt_left_state else (0, 255, 0)
-        head_tilt_right_color = (0, 0, 255) if head_tilt_right_state else (0, 255, 0)
-        both_eyes_color = (0, 0, 255) if both_eyes_closed_state else (0, 255, 0)
-
-        cv2.putText(frame, f"L EYE: {ear_left_val:.2f} ({'Closed' if left_eye_closed_state else 'Open'})", (10, 30),
-                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, left_eye_color, 2)
-        cv2.putText(frame, f"R EYE: {ear_right_val:.2f} ({'Closed' if right_eye_closed_state else 'Open'})", (10, 60),
-                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, right_eye_color, 2)
-        cv2.putText(frame, f"MAR: {mar_val:.2f} ({'Open' if mouth_open_state else 'Closed'})", (10, 90),
-                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, mouth_color, 2)
-        cv2.putText(frame, f"ERR: {avg_err:.2f} ({'Raised' if eyebrows_raised_state else 'Normal'})", (10, 120),
-                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, eyebrow_color, 2)
-        cv2.putText(frame, f"Head Tilt: {head_tilt_angle:.1f}° ({'Left' if head_tilt_left_state else 'Right' if head_tilt_right_state else 'Center'})", (10, 150),
-                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, head_tilt_left_color if head_tilt_left_state else head_tilt_right_color if head_tilt_right_state else (0, 255, 0), 2)
-        cv2.putText(frame, f"Both Eyes: {'Closed' if both_eyes_closed_state else 'Open'}", (10, 180),
-                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, both_eyes_color, 2)
-        
-        # Display active keys
-        active_keys_text = "Active Keys: " + ", ".join(keys_currently_pressed) if keys_currently_pressed else "No keys active"
-        cv2.putText(frame, active_keys_text, (10, 210),
-                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-        # Display blink feedback
-        if current_time - last_left_blink_time < 0.5:
-            cv2.putText(frame, "Left eye blink: 'shift+a' pressed", (10, 240),
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 215, 0), 2)
-        if current_time - last_right_blink_time < 0.5:
-            cv2.putText(frame, "Right eye blink: 'shift+d' pressed", (10, 270),
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 215, 0), 2)
-
-        # Display thresholds for reference
-        cv2.putText(frame, f"Head Tilt Left: {HEAD_TILT_LEFT_MIN}° to {HEAD_TILT_LEFT_MAX}° | Right: {HEAD_TILT_RIGHT_MIN}° to {HEAD_TILT_RIGHT_MAX}°", (10, 300),
-                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-
-        cv2.imshow('Facial Gesture Controller', frame)
-
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            break
+        if SHOW_UI:
+            put_latest(render_jobs, (frame, points, RenderState(
+                ear_left_val, ear_right_val, mar_sq_val, avg_err, head_tilt_angle,
+                left_eye_closed_state, right_eye_closed_state, mouth_open_state, eyebrows_raised_state,
+                head_tilt_left_state, head_tilt_right_state, both_eyes_closed_state, tuple(keys_currently_pressed),
+                current_time - last_left_blink_time < 0.5, current_time - last_right_blink_time < 0.5)))
 
+except KeyboardInterrupt:
+    pass
 except Exception as e:
     print(f"Error occurred: {e}")
 finally:
     # Clean up
+    stop_event.set()
+    capture_thread.join(timeout=1.0)  # Must be out of cap.read() before release()
+    if render_thread is not None:
+        put_latest(render_jobs, None)
+        render_thread.join(timeout=1.0)
     release_all_keys()
     cap.release()
-    cv2.destroyAllWindows()
+    (face_landmarker or face_mesh).close()
@@ -5,10 +5,16 @@ import pyautogui
 import time
 import math
 
+# pyautogui sleeps PAUSE (0.1 s) after every call by default, which blocks this frame loop on each key event
+pyautogui.PAUSE = 0
+
 # --- MediaPipe Hands Setup ---
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
 mp_drawing_styles = mp.solutions.drawing_styles
+# Drawing styles are constant; build them once instead of on every frame with a hand
+HAND_LANDMARKS_STYLE = mp_drawing_styles.get_default_hand_landmarks_style()
+HAND_CONNECTIONS_STYLE = mp_drawing_styles.get_default_hand_connections_style()
 
 # Initialize Hands - detect only one hand for simplicity and performance
 hands = mp_hands.Hands(
@@ -18,10 +24,22 @@ hands = mp_hands.Hands(
     min_tracking_confidence=0.5)
 
 # --- Camera Setup ---
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+CAMERA_FPS = 15         # Every captured frame costs a MediaPipe pass; the gesture debounce only needs ~15 FPS
+CAMERA_BUFFER_SIZE = 1  # Don't queue stale frames behind the one being processed
+CAMERA_FOURCC = 'MJPG'  # Compressed over USB instead of raw YUYV, so the requested size/FPS fit the bus
+
 cap = cv2.VideoCapture(0)
 if not cap.isOpened():
     print("Error: Cannot open camera")
     exit()
+# Drivers default to whatever they like (often 1280x720); these are requests, unsupported ones are ignored
+cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*CAMERA_FOURCC))  # Before the size: V4L2 picks sizes per format
+cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+cap.set(cv2.CAP_PROP_FPS, CAMERA_FPS)
+cap.set(cv2.CAP_PROP_BUFFERSIZE, CAMERA_BUFFER_SIZE)
 
 # --- Gesture State & Debouncing ---
 # Store the *last stable* detected gesture to avoid flickering actions
@@ -81,6 +99,8 @@ try:
             continue
 
         # --- Frame Preparation ---
+        if frame.shape[1] > CAMERA_WIDTH: # The driver ignored the size request; don't flip/convert the extra pixels
+            frame = cv2.resize(frame, (CAMERA_WIDTH, frame.shape[0] * CAMERA_WIDTH // frame.shape[1]), interpolation=cv2.INTER_AREA)
         frame = cv2.flip(frame, 1) # Mirror view
         frame_height, frame_width, _ = frame.shape
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -90,10 +110,7 @@ try:
 
         # --- Process with MediaPipe Hands ---
         results = hands.process(rgb_frame)
-
-        # Performance Optimization
-        rgb_frame.flags.writeable = True
-        frame = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR) # Convert back for drawing
+        # frame still holds the mirrored BGR image for drawing; rgb_frame was only the model's input copy
 
         # --- Gesture Recognition ---
         detected_gesture_this_frame = "NONE" # Reset for this frame
@@ -107,8 +124,8 @@ try:
                 frame,
                 hand_landmarks,
                 mp_hands.HAND_CONNECTIONS,
-                mp_drawing_styles.get_default_hand_landmarks_style(),
-                mp_drawing_styles.get_default_hand_connections_style())
+                HAND_LANDMARKS_STYLE,
+                HAND_CONNECTIONS_STYLE)
 
             # --- Get Coordinates of Fingertips and relevant joints ---
             # Store landmark coordinates for easier access
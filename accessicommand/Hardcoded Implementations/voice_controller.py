@@ -90,7 +90,7 @@ class VoiceListener:
 
 
         except sr.UnknownValueError:
-            print("Voice Listener: Could not understand audio.")
+            pass  # Unintelligible audio (noise, coughs) is routine, not an error
         except sr.RequestError as e:
             print(f"ERROR: Could not request results (Network issue?): {e}")
         except Exception as e:
@@ -103,12 +103,16 @@ class VoiceListener:
     def _listen_loop(self):
         """The core listening loop running in a background thread."""
         print("Voice Listener: Background listening thread started.")
-        while self.running:
-            audio_data = None
-            if not self.running: break
+        # Open the microphone stream once and reuse it for every phrase; reopen only after an OSError
+        source = None
+        try:
+            while self.running:
+                audio_data = None
+                if not self.running: break
 
-            try:
-                with self.microphone as source:
+                try:
+                    if source is None:
+                        source = self.microphone.__enter__()
                     print("Voice Listener: Waiting for phrase...")
                     self._is_listening = True
                     audio_data = self.recognizer.listen(
@@ -119,23 +123,32 @@ class VoiceListener:
                     self._is_listening = False
                     print("Voice Listener: Processing speech...")
 
-                if audio_data and self.running:
-                     self._process_audio_and_act(audio_data)
+                    if audio_data and self.running:
+                         self._process_audio_and_act(audio_data)
 
-            except sr.WaitTimeoutError:
-                self._is_listening = False
-                continue 
-            except OSError as e:
-                 self._is_listening = False
-                 print(f"ERROR: Microphone OS Error: {e}. Check microphone connection/permissions.")
-                 time.sleep(2) 
-            except Exception as e:
-                self._is_listening = False
-                print(f"ERROR: Unexpected error in listening loop: {e}")
-                print("--- Listening Loop Traceback ---")
-                traceback.print_exc()
-                print("-----------------------------")
-                time.sleep(1) 
+                except sr.WaitTimeoutError:
+                    self._is_listening = False
+                    continue 
+                except OSError as e:
+                     self._is_listening = False
+                     print(f"ERROR: Microphone OS Error: {e}. Check microphone connection/permissions.")
+                     if source is not None:
+                         try:
+                             self.microphone.__exit__(None, None, None)
+                         except Exception:
+                             pass
+                         source = None
+                     time.sleep(2) 
+                except Exception as e:
+                    self._is_listening = False
+                    print(f"ERROR: Unexpected error in listening loop: {e}")
+                    print("--- Listening Loop Traceback ---")
+                    traceback.print_exc()
+                    print("-----------------------------")
+                    time.sleep(1) 
+        finally:
+            if source is not None:
+                self.microphone.__exit__(None, None, None)
 
         print("Voice Listener: Background listening thread stopped.")
 
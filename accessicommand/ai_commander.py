@@ -165,7 +165,7 @@ class UICommander:
                                 print("[UIC LOG] Activation phrase heard, no command.")
                         # else: print("[UIC LOG] Activation phrase not detected.") # Noisy
 
-                    except sr.UnknownValueError: print("[UIC LOG] Whisper couldn't understand audio.") # Changed log prefix
+                    except sr.UnknownValueError: pass # Unintelligible audio is routine, not an error
                     except sr.RequestError as e: print(f"ERROR [UIC]: Whisper RequestError: {e}") # Changed log prefix
                     except Exception as e: print(f"ERROR [UIC]: Transcription/Processing error: {e}"); traceback.print_exc() # Changed log prefix
                 # elif not audio_data:
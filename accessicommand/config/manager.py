@@ -1,5 +1,7 @@
 import json
 import os
+import copy
+import threading
 import traceback
 
 DEFAULT_CONFIG = {
@@ -15,6 +17,16 @@ DEFAULT_CONFIG = {
     }
 }
 
+# Parsed config files shared by all ConfigManager instances: abspath -> ((mtime_ns, size), parsed)
+# The GUI and the Engine each hold a manager for the same file; an unchanged file is parsed only once.
+_cfg_cache = {}
+_cfg_cache_lock = threading.Lock()
+
+def _file_stamp(path):
+    """Returns (mtime_ns, size) for path, or None if it can't be stat'ed."""
+    try: st = os.stat(path); return (st.st_mtime_ns, st.st_size)
+    except OSError: return None
+
 class ConfigManager:
     """Handles loading and saving application configuration from/to a JSON file."""
 
@@ -27,14 +39,24 @@ class ConfigManager:
         """
         self.config_path = config_path
         self.config_data = {}
+        self._stamp = None # (mtime_ns, size) of the file self.config_data was read from/written to
         self._load_or_create_config()
 
     def _load_or_create_config(self):
         """Loads config from file or creates a default one if it doesn't exist."""
         if os.path.exists(self.config_path):
+            key = os.path.abspath(self.config_path); stamp = _file_stamp(self.config_path)
+            with _cfg_cache_lock: cached = _cfg_cache.get(key)
+            if stamp is not None and cached and cached[0] == stamp:
+                # Unchanged on disk: skip the read + parse, but give this instance its own copy to mutate
+                self.config_data = copy.deepcopy(cached[1]); self._stamp = stamp
+                print(f"ConfigManager: Configuration loaded from '{self.config_path}' (cached)")
+                return
             try:
                 with open(self.config_path, 'r', encoding='utf-8') as f:
                     self.config_data = json.load(f)
+                self._stamp = stamp
+                with _cfg_cache_lock: _cfg_cache[key] = (stamp, copy.deepcopy(self.config_data))
                 print(f"ConfigManager: Configuration loaded from '{self.config_path}'")
             except json.JSONDecodeError:
                 print(f"ERROR: Invalid JSON in '{self.config_path}'. Using default config.")
@@ -54,6 +76,8 @@ class ConfigManager:
         try:
             with open(self.config_path, 'w', encoding='utf-8') as f:
                 json.dump(self.config_data, f, indent=4) # Use indent for readability
+            self._stamp = _file_stamp(self.config_path)
+            with _cfg_cache_lock: _cfg_cache[os.path.abspath(self.config_path)] = (self._stamp, copy.deepcopy(self.config_data))
             # print(f"ConfigManager: Configuration saved to '{self.config_path}'") # Can be noisy
             return True
         except Exception as e:
@@ -61,6 +85,26 @@ class ConfigManager:
             traceback.print_exc()
             return False
 
+    def refresh(self):
+        """Re-reads the file if it changed since this instance last loaded or saved it (e.g. saved by
+        another ConfigManager). A stat call when nothing changed."""
+        stamp = _file_stamp(self.config_path)
+        if stamp == self._stamp: return
+        # Only ever re-reads: a missing or half-written file keeps the current config (and stamp, so the next
+        # refresh retries) instead of taking the create-default/save path, which would overwrite the user's file
+        if stamp is None:
+            print(f"WARN: Config file '{self.config_path}' missing; keeping the current configuration."); return
+        key = os.path.abspath(self.config_path)
+        with _cfg_cache_lock: cached = _cfg_cache.get(key)
+        if cached and cached[0] == stamp: self.config_data = copy.deepcopy(cached[1]); self._stamp = stamp; return
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f: config_data = json.load(f)
+        except Exception as e:
+            print(f"WARN: Could not re-read config file '{self.config_path}' ({e}); keeping the current configuration."); return
+        self.config_data = config_data; self._stamp = stamp
+        with _cfg_cache_lock: _cfg_cache[key] = (stamp, copy.deepcopy(config_data))
+        print(f"ConfigManager: Configuration reloaded from '{self.config_path}'")
+
     def get_config(self):
         """Returns the entire loaded configuration dictionary."""
         return self.config_data
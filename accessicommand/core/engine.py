@@ -2,26 +2,26 @@
 import sys
 import os
 import traceback
+import importlib
+import functools
+import logging
 import time
+import queue
 import threading
+from collections import namedtuple
 import cv2
-import mediapipe as mp
+import numpy as np
+# mediapipe is imported only where it is used (detector start(), main-loop drawing), so a voice-only
+# setup never loads it
 
-# Initialize MediaPipe drawing utilities
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
-mp_hands = mp.solutions.hands
-mp_face_mesh = mp.solutions.face_mesh
+log = logging.getLogger(__name__)
 
 # Absolute Imports
 try:
     from accessicommand.config.manager import ConfigManager
-    from accessicommand.detectors.voice_detector import VoiceDetector # Removed UI_KEYWORDS import, not needed here
-    from accessicommand.detectors.facial_detector import FacialDetector
-    from accessicommand.detectors.hand_detector import HandDetector
+    # Detector modules (speech_recognition, mediapipe models) are imported in _initialize_detectors, only when bound
     from accessicommand.actions.registry import get_action_function, ACTION_REGISTRY
     from accessicommand.ui.main_window import AppGUI # Keep this import
-    _imports_ok = True
 except ImportError as e: print(f"ERROR: Import failed: {e}"); sys.exit(1)
 
 # Engine Default Constants
@@ -38,23 +38,92 @@ DEFAULT_HEAD_TILT_RIGHT_MIN = 100; DEFAULT_HEAD_TILT_RIGHT_MAX = 160
 DEFAULT_CONSEC_FRAMES_MOUTH = 3; DEFAULT_CONSEC_FRAMES_EYEBROW = 3
 DEFAULT_CONSEC_FRAMES_HEAD_TILT = 2; DEFAULT_BLINK_COOLDOWN = 0.3
 DEFAULT_CONSEC_FRAMES_BLINK = 2
+DEFAULT_FACE_DETECTION_WIDTH = 480 # Downscale width for FaceMesh input
+DEFAULT_FACE_STATIC_SKIP_THRESHOLD = 0.0 # >0 skips FaceMesh on near-static frames (see FacialDetector)
+DEFAULT_FACE_INFERENCE_STRIDE = 1 # Run FaceMesh every Nth frame
+DEFAULT_FACE_BACKEND = "solutions"; DEFAULT_FACE_MODEL_ASSET_PATH = "face_landmarker.task"; DEFAULT_FACE_USE_GPU = True # "tasks" = FaceLandmarker (GPU-capable)
 # Hand
 DEFAULT_HAND_CAMERA_INDEX = 0; DEFAULT_MAX_HANDS = 1
 DEFAULT_DETECTION_CONFIDENCE = 0.7; DEFAULT_TRACKING_CONFIDENCE = 0.5
 DEFAULT_CONSEC_FRAMES_FOR_GESTURE = 5
+DEFAULT_HAND_DETECTION_WIDTH = 480 # Downscale width for Hands input
+DEFAULT_HAND_INFERENCE_STRIDE = 1 # Run Hands every Nth frame
 # Visualization
 DEFAULT_SHOW_FACE_VIDEO = False; DEFAULT_SHOW_HAND_VIDEO = False
+VIS_WINDOW_NAME = 'AccessiCommand Output'
+# Camera capture format: MJPG at 640x480 keeps USB bandwidth and decode cost low (the detectors downscale
+# below this anyway); BUFFERSIZE=1 stops the driver queueing stale frames. Unsupported props are ignored.
+CAMERA_FOURCC = 'MJPG'; CAMERA_FRAME_WIDTH = 640; CAMERA_FRAME_HEIGHT = 480; CAMERA_BUFFER_SIZE = 1
+VIS_VISIBILITY_CHECK_FRAMES = 30 # getWindowProperty isn't free; poll it every N frames (a hidden window is also redrawn then)
+
+# Registered detector: start/stop are bound once here instead of re-resolved on every start()/stop()
+Detector = namedtuple('Detector', ['type', 'instance', 'start_fn', 'stop_fn'])
+
+
+@functools.lru_cache(maxsize=128)
+def _face_state_text(state_items):
+    """ The 'Face: ...' overlay line for a tuple of (state_name, active) pairs. Few combinations occur, so
+    the split/join is done once per combination instead of every visualized frame. """
+    f_active = [k.split('_')[0] for k, v in state_items if v]
+    return "Face: " + (",".join(f_active) if f_active else "None")
+
+
+def _ignore_event(detector_type, event_data): pass
+
+class _EventSink:
+    """ The callable detectors get as their event_handler. Engine points `target` at handle_event while
+    running and at _ignore_event otherwise, so the per-event path has no running check. """
+    __slots__ = ('target',)
+    def __init__(self, target=_ignore_event): self.target = target
+    def __call__(self, detector_type, event_data): self.target(detector_type, event_data)
+
+class _FrameGrabber:
+    """ Reads one camera on its own thread and keeps only the newest (seq, frame, timestamp), so the main
+    loop's inference overlaps the next grab instead of blocking on cap.read(). Stale frames are dropped. """
+    __slots__ = ('cam_index', 'cap', 'latest', 'running', 'thread', '_ready')
+    def __init__(self, cam_index, cap, ready_event):
+        self.cam_index = cam_index; self.cap = cap; self._ready = ready_event
+        self.latest = None; self.running = False; self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"AccessiCommandCam{self.cam_index}", daemon=True); self.thread.start()
+
+    def _run(self):
+        seq = 0
+        while self.running and self.cap.isOpened():
+            ret, frame = self.cap.read()
+            if not ret: print(f"WARN: Frame grab fail cam {self.cam_index}."); time.sleep(0.01); continue
+            seq += 1; self.latest = (seq, frame, time.monotonic()); self._ready.set() # One assignment: readers never see a torn triple
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread.is_alive(): self.thread.join(timeout=1.0) # Must be out of cap.read() before release()
+        self.thread = None
 
 
 class Engine:
-    # ... (Keep __init__, _load_configuration, _initialize_actions as is) ...
+    # Fixed attribute set: no per-instance __dict__, and slot access on the per-event/per-frame paths
+    __slots__ = ('app_gui', 'config_manager', 'config_data', 'bindings', 'settings', 'detectors',
+                 '_binding_index', '_bindings_by_type', '_detector_fingerprints', '_event_sink', '_action_queue', '_action_worker',
+                 'is_running', 'main_loop_thread', '_stop_event', 'capture_devices', 'visual_detectors_by_cam',
+                 'show_combined_video', 'vis_settings')
+
     def __init__(self, config_path="config.json", app_gui_instance=None):
         print("--- Engine Initializing ---")
         self.app_gui = app_gui_instance
         if self.app_gui is None: print("WARN: Engine missing AppGUI instance.")
         self.config_manager = ConfigManager(config_path)
         self.detectors = {}; self.bindings = []; self.settings = {}
+        self._binding_index = {} # (trigger_type, trigger_event as configured / lowercased) -> (action_id, action callable)
+        self._bindings_by_type = {} # trigger_type -> [binding, ...], in config order
+        self._detector_fingerprints = {} # detector type -> inputs it was built from; see _initialize_detectors
         self.is_running = False; self.main_loop_thread = None
+        self._event_sink = _EventSink() # Handed to every detector; dropped events until start()
+        self._stop_event = threading.Event() # Set whenever the engine leaves the running state
+        # Bound actions (key presses etc.) run on one worker thread, in event order, so a slow OS call
+        # never stalls the camera loop or the voice thread that raised the event (started in start())
+        self._action_queue = queue.SimpleQueue(); self._action_worker = None
         self.capture_devices = {}; self.visual_detectors_by_cam = {}
         self.show_combined_video = False; self.vis_settings = {}
         self._load_configuration(); self._initialize_actions(); self._initialize_detectors()
@@ -63,11 +132,34 @@ class Engine:
     def _load_configuration(self):
         print(f"Engine: Loading configuration from '{self.config_manager.config_path}'...")
         try:
-            self.config_data=self.config_manager.get_config(); self.bindings=self.config_manager.get_bindings(); self.settings=self.config_manager.get_settings()
+            # Pick up edits saved through the GUI's own ConfigManager; no re-parse if the file is unchanged
+            self.config_manager.refresh()
+            # One lookup on the manager; bindings/settings come straight from the same dict
+            self.config_data=self.config_manager.get_config(); self.bindings=self.config_data.get("bindings", []); self.settings=self.config_data.get("settings", {})
             facial_settings=self.settings.get('facial_detector',{}); hand_settings=self.settings.get('hand_detector',{})
             self.vis_settings['show_face']=facial_settings.get('show_video',DEFAULT_SHOW_FACE_VIDEO); self.vis_settings['show_hand']=hand_settings.get('show_video',DEFAULT_SHOW_HAND_VIDEO)
             self.show_combined_video=self.vis_settings['show_face'] or self.vis_settings['show_hand']; print(f"Engine: Loaded {len(self.bindings)} bindings.")
         except Exception as e: print(f"ERROR loading config: {e}"); traceback.print_exc(); self.bindings=[]; self.settings={}
+        self._build_binding_index()
+
+    def _build_binding_index(self):
+        """Builds the event -> action lookup used by handle_event and groups bindings by trigger type
+        for _initialize_detectors, in one pass. First binding with an action wins.
+        Each winning binding is keyed both by its lowercased event and by the event string exactly as
+        configured, so detectors emitting that exact string (the *_EVENT constants) skip .lower().
+        Action IDs are resolved here once, so unknown IDs are reported at load time instead of per event."""
+        index = {}; by_type = {}
+        for b in self.bindings:
+            t = b.get("trigger_type"); e = b.get("trigger_event"); a = b.get("action_id")
+            if t: by_type.setdefault(t, []).append(b)
+            if not (t and e and a): continue
+            key = (t, str(e).lower())
+            if key in index: continue
+            action_func = get_action_function(a) # Warns if the ID isn't registered
+            if callable(action_func):
+                index[key] = (a, action_func) # ID kept only for log messages
+                index.setdefault((t, str(e)), index[key])
+        self._binding_index = index; self._bindings_by_type = by_type
 
     def _initialize_actions(self):
         if not callable(get_action_function): print("ERROR: get_action_function unavailable!")
@@ -77,157 +169,241 @@ class Engine:
     def _initialize_detectors(self):
         # (Keep this method exactly as it was in the previous response)
         print("Engine: Initializing detectors...")
-        self.detectors = {}; self.visual_detectors_by_cam = {}
+        # Detectors whose inputs (triggers + settings) are unchanged since the last init are reused as-is,
+        # so a restart that only touched other bindings doesn't reload models or re-open the mic
+        prev_detectors = self.detectors; prev_fingerprints = self._detector_fingerprints
+        self.detectors = {}; self.visual_detectors_by_cam = {}; self._detector_fingerprints = {}
         # Voice Detector Init
-        voice_triggers_needed = any(b.get("trigger_type") == "voice" for b in self.bindings)
-        if voice_triggers_needed:
-            try:
-                print("Engine: Initializing VoiceDetector (for system triggers and UI commands)...")
-                voice_settings = self.settings.get('voice_detector', {})
-                self.detectors['voice'] = VoiceDetector(
-                    event_handler=self.handle_event, # Single handler for both event types
-                    system_trigger_words=list(set(str(b.get("trigger_event")).lower() for b in self.bindings if b.get("trigger_type") == "voice" and b.get("trigger_event"))), # Pass only system triggers
-                    energy_threshold=voice_settings.get('energy_threshold', DEFAULT_VOICE_ENERGY_THRESHOLD),
-                    pause_threshold=voice_settings.get('pause_threshold', DEFAULT_VOICE_PAUSE_THRESHOLD),
-                    # device_index=voice_settings.get('device_index', None) # Optional mic index
-                )
-            except Exception as e: print(f"ERROR init VoiceDetector failed: {e}"); traceback.print_exc()
+        voice_bindings = self._bindings_by_type.get("voice", [])
+        if voice_bindings:
+            voice_settings = self.settings.get('voice_detector', {})
+            voice_trigger_words = frozenset(str(b["trigger_event"]).lower() for b in voice_bindings if b.get("trigger_event"))
+            fingerprint = (voice_trigger_words, sorted(voice_settings.items()))
+            prev_voice = prev_detectors.get('voice')
+            # A listener thread that outlived stop() still holds the old instance's mic; build a fresh one then
+            prev_voice_idle = prev_voice is not None and not (prev_voice.instance.thread and prev_voice.instance.thread.is_alive())
+            if prev_voice_idle and prev_fingerprints.get('voice') == fingerprint:
+                print("Engine: Voice config unchanged, reusing VoiceDetector.")
+                self.detectors['voice'] = prev_detectors['voice']; self._detector_fingerprints['voice'] = fingerprint
+            else:
+                try:
+                    from accessicommand.detectors.voice_detector import VoiceDetector
+                    print("Engine: Initializing VoiceDetector (for system triggers and UI commands)...")
+                    voice_detector = VoiceDetector(
+                        event_handler=self._event_sink, # Single handler for both event types
+                        system_trigger_words=voice_trigger_words, # Pass only system triggers (already normalized)
+                        energy_threshold=voice_settings.get('energy_threshold', DEFAULT_VOICE_ENERGY_THRESHOLD),
+                        pause_threshold=voice_settings.get('pause_threshold', DEFAULT_VOICE_PAUSE_THRESHOLD),
+                        ui_enabled=hasattr(self.app_gui, 'execute_ui_command'), # UI commands only matter with a GUI to run them
+                        # device_index=voice_settings.get('device_index', None) # Optional mic index
+                    )
+                    self.detectors['voice'] = Detector('voice', voice_detector, voice_detector.start, getattr(voice_detector, 'stop', None))
+                    self._detector_fingerprints['voice'] = fingerprint
+                except ImportError as e: print(f"ERROR: VoiceDetector import failed: {e}")
+                except Exception as e: print(f"ERROR init VoiceDetector failed: {e}"); traceback.print_exc()
         else: print("Engine: No voice features needed.") # Changed log slightly
         # Visual Detectors Init
         visual_detector_configs = {
-            'face': {'class': FacialDetector, 'settings_key': 'facial_detector', 'defaults': {
-                'ear_threshold': DEFAULT_EAR_THRESHOLD, 'mar_threshold': DEFAULT_MAR_THRESHOLD,'err_threshold': DEFAULT_ERR_THRESHOLD, 'both_eyes_closed_frames': DEFAULT_BOTH_EYES_CLOSED_FRAMES,'head_tilt_left_min': DEFAULT_HEAD_TILT_LEFT_MIN, 'head_tilt_left_max': DEFAULT_HEAD_TILT_LEFT_MAX,'head_tilt_right_min': DEFAULT_HEAD_TILT_RIGHT_MIN, 'head_tilt_right_max': DEFAULT_HEAD_TILT_RIGHT_MAX,'consec_frames_blink': DEFAULT_CONSEC_FRAMES_BLINK,'consec_frames_mouth': DEFAULT_CONSEC_FRAMES_MOUTH,'consec_frames_eyebrow': DEFAULT_CONSEC_FRAMES_EYEBROW, 'consec_frames_head_tilt': DEFAULT_CONSEC_FRAMES_HEAD_TILT,'blink_cooldown': DEFAULT_BLINK_COOLDOWN}},
-            'hand': {'class': HandDetector, 'settings_key': 'hand_detector', 'defaults': {
-                'max_num_hands': DEFAULT_MAX_HANDS, 'min_detection_confidence': DEFAULT_DETECTION_CONFIDENCE,'min_tracking_confidence': DEFAULT_TRACKING_CONFIDENCE,'consec_frames_for_gesture': DEFAULT_CONSEC_FRAMES_FOR_GESTURE}}}
+            'face': {'module': 'facial_detector', 'class': 'FacialDetector', 'settings_key': 'facial_detector', 'defaults': {
+                'ear_threshold': DEFAULT_EAR_THRESHOLD, 'mar_threshold': DEFAULT_MAR_THRESHOLD,'err_threshold': DEFAULT_ERR_THRESHOLD, 'both_eyes_closed_frames': DEFAULT_BOTH_EYES_CLOSED_FRAMES,'head_tilt_left_min': DEFAULT_HEAD_TILT_LEFT_MIN, 'head_tilt_left_max': DEFAULT_HEAD_TILT_LEFT_MAX,'head_tilt_right_min': DEFAULT_HEAD_TILT_RIGHT_MIN, 'head_tilt_right_max': DEFAULT_HEAD_TILT_RIGHT_MAX,'consec_frames_blink': DEFAULT_CONSEC_FRAMES_BLINK,'consec_frames_mouth': DEFAULT_CONSEC_FRAMES_MOUTH,'consec_frames_eyebrow': DEFAULT_CONSEC_FRAMES_EYEBROW, 'consec_frames_head_tilt': DEFAULT_CONSEC_FRAMES_HEAD_TILT,'blink_cooldown': DEFAULT_BLINK_COOLDOWN, 'detection_width': DEFAULT_FACE_DETECTION_WIDTH, 'static_skip_threshold': DEFAULT_FACE_STATIC_SKIP_THRESHOLD, 'inference_stride': DEFAULT_FACE_INFERENCE_STRIDE, 'backend': DEFAULT_FACE_BACKEND, 'model_asset_path': DEFAULT_FACE_MODEL_ASSET_PATH, 'use_gpu': DEFAULT_FACE_USE_GPU}},
+            'hand': {'module': 'hand_detector', 'class': 'HandDetector', 'settings_key': 'hand_detector', 'defaults': {
+                'max_num_hands': DEFAULT_MAX_HANDS, 'min_detection_confidence': DEFAULT_DETECTION_CONFIDENCE,'min_tracking_confidence': DEFAULT_TRACKING_CONFIDENCE,'consec_frames_for_gesture': DEFAULT_CONSEC_FRAMES_FOR_GESTURE, 'detection_width': DEFAULT_HAND_DETECTION_WIDTH, 'inference_stride': DEFAULT_HAND_INFERENCE_STRIDE}}}
         default_face_cam_idx = DEFAULT_CAMERA_INDEX; default_hand_cam_idx = DEFAULT_HAND_CAMERA_INDEX
         for det_type, config_info in visual_detector_configs.items():
-            needs_init = any(b.get("trigger_type") == det_type for b in self.bindings)
+            needs_init = bool(self._bindings_by_type.get(det_type))
             if needs_init:
-                 DetectorClass = config_info['class'];
-                 if DetectorClass is None or not _imports_ok: print(f"WARN: Cannot init {det_type}."); continue
-                 try:
-                     print(f"Engine: Initializing {DetectorClass.__name__}..."); settings = self.settings.get(config_info['settings_key'], {}); init_kwargs = config_info['defaults'].copy()
-                     default_cam = default_face_cam_idx if det_type == 'face' else default_hand_cam_idx; cam_index = settings.get('camera_index', default_cam)
-                     for key in list(init_kwargs.keys()):
-                         if key in settings: init_kwargs[key] = settings[key]
-                     init_kwargs.pop('camera_index', None); init_kwargs.pop('show_video', None)
-                     detector_instance = DetectorClass(event_handler=self.handle_event, **init_kwargs)
-                     self.detectors[det_type] = detector_instance
-                     if cam_index not in self.visual_detectors_by_cam: self.visual_detectors_by_cam[cam_index] = []
-                     self.visual_detectors_by_cam[cam_index].append(detector_instance); print(f"   - Added {DetectorClass.__name__} to camera index {cam_index}")
-                 except Exception as e: print(f"ERROR: Init {DetectorClass.__name__} failed: {e}"); traceback.print_exc()
+                 settings = self.settings.get(config_info['settings_key'], {}); init_kwargs = config_info['defaults'].copy()
+                 default_cam = default_face_cam_idx if det_type == 'face' else default_hand_cam_idx; cam_index = settings.get('camera_index', default_cam)
+                 for key in list(init_kwargs.keys()):
+                     if key in settings: init_kwargs[key] = settings[key]
+                 init_kwargs.pop('camera_index', None); init_kwargs.pop('show_video', None)
+                 fingerprint = (cam_index, sorted(init_kwargs.items()))
+                 if det_type in prev_detectors and prev_fingerprints.get(det_type) == fingerprint:
+                     det = prev_detectors[det_type]; print(f"Engine: {config_info['class']} config unchanged, reusing instance.")
+                 else:
+                     try: DetectorClass = getattr(importlib.import_module(f"accessicommand.detectors.{config_info['module']}"), config_info['class'])
+                     except (ImportError, AttributeError) as e: DetectorClass = None; print(f"ERROR: {config_info['class']} import failed: {e}")
+                     if DetectorClass is None: print(f"WARN: Cannot init {det_type}."); continue
+                     try:
+                         print(f"Engine: Initializing {DetectorClass.__name__}...")
+                         detector_instance = DetectorClass(event_handler=self._event_sink, **init_kwargs)
+                         det = Detector(det_type, detector_instance, getattr(detector_instance, 'start', None), getattr(detector_instance, 'stop', None))
+                     except Exception as e: print(f"ERROR: Init {DetectorClass.__name__} failed: {e}"); traceback.print_exc(); continue
+                 self.detectors[det_type] = det; self._detector_fingerprints[det_type] = fingerprint
+                 if cam_index not in self.visual_detectors_by_cam: self.visual_detectors_by_cam[cam_index] = []
+                 self.visual_detectors_by_cam[cam_index].append(det); print(f"   - Added {config_info['class']} to camera index {cam_index}")
             else: print(f"Engine: No {det_type} bindings found.")
         print(f"Engine: Initialized active detectors: {list(self.detectors.keys())}")
-        print(f"Engine: Camera mapping: { {k: [d.__class__.__name__ for d in v] for k, v in self.visual_detectors_by_cam.items()} }")
+        print(f"Engine: Camera mapping: { {k: [d.instance.__class__.__name__ for d in v] for k, v in self.visual_detectors_by_cam.items()} }")
 
-    def handle_event(self, detector_type, event_data):
-        # (Keep as before)
-        if not self.is_running: return
-        print(f"Engine: Event received - Type: '{detector_type}', Data: '{event_data}'")
+    def handle_event(self, detector_type, event_data, _log=log, _DEBUG=logging.DEBUG, _str=str, _isinstance=isinstance):
+        """ Dispatches one detector event. Only reached through _event_sink while the engine is running.
+        The underscore defaults bind module globals/builtins as locals; callers never pass them. """
+        # Hot path: %-style args and the isEnabledFor guard mean nothing is formatted unless DEBUG is on
+        debug = _log.isEnabledFor(_DEBUG)
+        if debug: _log.debug("Engine: Event received - Type: '%s', Data: '%s'", detector_type, event_data)
         if detector_type == "ui_command":
             if self.app_gui and hasattr(self.app_gui, 'execute_ui_command'):
-                print(f"Engine: Routing UI command to GUI: '{event_data}'")
+                if debug: _log.debug("Engine: Routing UI command to GUI: '%s'", event_data)
                 try: self.app_gui.execute_ui_command(event_data)
-                except Exception as ui_e: print(f"ERROR: UI command execute failed: {ui_e}"); traceback.print_exc()
-            else: print("WARN: Received UI command but GUI handler unavailable.")
+                except Exception as ui_e: _log.exception("ERROR: UI command execute failed: %s", ui_e)
+            else: _log.warning("WARN: Received UI command but GUI handler unavailable.")
             return
-        event_key = str(event_data).lower(); action_id_to_execute = None
-        for binding in self.bindings:
-            if binding.get("trigger_type") == detector_type and str(binding.get("trigger_event", "")).lower() == event_key:
-                action_id_to_execute = binding.get("action_id")
-                if action_id_to_execute: print(f"Engine: Found binding -> Action ID '{action_id_to_execute}'"); break
-                else: print(f"WARN: Binding for '{event_key}' lacks 'action_id'.")
-        if action_id_to_execute:
-            action_func = get_action_function(action_id_to_execute)
-            if action_func:
-                try: print(f"Engine: Executing action '{action_id_to_execute}'..."); action_func()
-                except Exception as e: print(f"ERROR executing action '{action_id_to_execute}': {e}"); traceback.print_exc()
-            else: print(f"WARN: Action ID '{action_id_to_execute}' not in registry!")
+        # Exact-string hit first (events match the configured spelling); lowercase only on a miss
+        index = self._binding_index
+        entry = index.get((detector_type, event_data)) if _isinstance(event_data, _str) else None
+        if entry is None: entry = index.get((detector_type, (event_data if _isinstance(event_data, _str) else _str(event_data)).lower()))
+        if entry:
+            if debug: _log.debug("Engine: Queueing '%s' bound to '%s'...", entry[0], event_data)
+            self._action_queue.put((entry[0], entry[1], event_data)) # Never blocks; run by _action_worker_loop
+
+    def _action_worker_loop(self):
+        """ Runs queued (action_id, action_func, event_data) items one at a time until the None sentinel from stop(). """
+        get = self._action_queue.get
+        while True:
+            item = get()
+            if item is None: break # Sentinel from _stop_action_worker
+            if not self.is_running: continue # Stopping: drop actions still queued behind the sentinel
+            action_id, action_func, event_data = item
+            try:
+                if log.isEnabledFor(logging.DEBUG): log.debug("Engine: Executing '%s' bound to '%s'...", action_id, event_data)
+                action_func()
+            except Exception as e: log.exception("ERROR executing '%s' for '%s': %s", action_id, event_data, e)
+        log.debug("Engine: Action worker finished.")
+
+    def _start_action_worker(self):
+        """ Starts the action worker unless one is still running (e.g. the main loop ended without stop()). """
+        if self._action_worker is not None and self._action_worker.is_alive(): return
+        self._action_queue = queue.SimpleQueue() # Fresh per worker: one that outlived its stop() join drains only its own
+        self._action_worker = threading.Thread(target=self._action_worker_loop, name="AccessiCommandActions", daemon=True)
+        self._action_worker.start()
+
+    def _stop_action_worker(self, timeout):
+        """ Wakes the action worker with the stop sentinel and waits for it briefly. """
+        if self._action_worker is None: return
+        self._action_queue.put(None); self._action_worker.join(timeout=timeout)
+        if self._action_worker.is_alive(): print("WARN: Action worker still busy; it exits after the current action.")
+        self._action_worker = None
 
     def _run_main_loop(self):
         # (Keep as before)
         print("Engine: Starting main processing loop...")
-        active_captures = {}
+        active_captures = {}; grabbers = {}
         try:
             for cam_index in self.visual_detectors_by_cam.keys():
                 print(f"Engine: Initializing camera {cam_index}...")
                 cap = cv2.VideoCapture(cam_index); time.sleep(0.5)
                 if not cap.isOpened(): print(f"ERROR: Cannot open camera {cam_index}!"); continue
-                active_captures[cam_index] = cap; print(f"Engine: Camera {cam_index} opened.")
+                cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*CAMERA_FOURCC))
+                cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_FRAME_WIDTH); cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_FRAME_HEIGHT)
+                cap.set(cv2.CAP_PROP_BUFFERSIZE, CAMERA_BUFFER_SIZE)
+                active_captures[cam_index] = cap; print(f"Engine: Camera {cam_index} opened ({int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}).")
             if not active_captures: print("ERROR: No cameras opened."); self.is_running = False; return
-            frame_width, frame_height = {}, {}
+            frame_ready = threading.Event() # Set by any grabber with a new frame
+            for cam_index, cap in active_captures.items():
+                grabbers[cam_index] = _FrameGrabber(cam_index, cap, frame_ready); grabbers[cam_index].start()
+            last_seq = dict.fromkeys(grabbers, 0)
+            flip_bufs, rgb_bufs = {}, {} # Per-camera preallocated RGB (detectors) / mirrored BGR (preview) frames, reused via dst=
+            vis_frame_count = 0; vis_window_shown = False; vis_visible = True
+            if self.show_combined_video:
+                # Drawing helpers; the visual detectors have already loaded mediapipe by now, so this is cheap.
+                # Styles are constant: built once per loop instead of every visualized frame
+                import mediapipe as mp
+                mp_drawing = mp.solutions.drawing_utils; mp_drawing_styles = mp.solutions.drawing_styles
+                face_contours = mp.solutions.face_mesh.FACEMESH_CONTOURS; hand_connections = mp.solutions.hands.HAND_CONNECTIONS
+                face_contours_style = mp_drawing_styles.get_default_face_mesh_contours_style()
+                hand_connections_style = mp_drawing_styles.get_default_hand_connections_style()
             while self.is_running:
+                # Wait for the next frame from any camera; the timeout keeps the stop check and waitKey responsive.
+                # Clearing before collecting means a frame that lands meanwhile is either taken now or re-sets the event
+                frame_ready.wait(0.1); frame_ready.clear()
                 frames = {}; timestamps = {}
-                # Read frames
-                for cam_index, cap in active_captures.items():
-                    if not cap.isOpened(): frames[cam_index]=None; continue
-                    ret, frame = cap.read()
-                    if not ret: print(f"WARN: Frame grab fail cam {cam_index}."); frames[cam_index]=None; continue
-                    if cam_index not in frame_width: frame_height[cam_index], frame_width[cam_index], _ = frame.shape
-                    frames[cam_index] = frame; timestamps[cam_index] = time.time()
+                # Take each camera's newest frame; a camera with nothing new this tick is skipped, never waited on
+                for cam_index, grabber in grabbers.items():
+                    latest = grabber.latest
+                    if latest is None or latest[0] == last_seq[cam_index]: frames[cam_index] = None; continue
+                    last_seq[cam_index], frames[cam_index], timestamps[cam_index] = latest
                 # Process frames
                 vis_results = {}
                 for cam_index, frame in frames.items():
                     if frame is None: continue
-                    frame_flipped = cv2.flip(frame, 1)
-                    rgb_frame = cv2.cvtColor(frame_flipped, cv2.COLOR_BGR2RGB)
+                    rgb_frame = rgb_bufs.get(cam_index)
+                    if rgb_frame is None or rgb_frame.shape != frame.shape:
+                        rgb_bufs[cam_index] = rgb_frame = np.empty_like(frame)
+                    rgb_frame.flags.writeable = True
+                    # Convert, then mirror in place: no intermediate flipped-BGR frame, ~40% cheaper than flip-then-convert
+                    cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_frame) # Detectors must not keep a reference past process_frame
+                    cv2.flip(rgb_frame, 1, dst=rgb_frame)
+                    # The engine owns this buffer: handed to every detector read-only (MediaPipe then skips its copy)
+                    # and made writable again only for next tick's cvtColor
+                    rgb_frame.flags.writeable = False
                     vis_results[cam_index] = {}
-                    for detector in self.visual_detectors_by_cam.get(cam_index, []):
-                        detector_type = next((k for k, v in self.detectors.items() if v == detector), None)
-                        if detector_type and detector.is_active:
+                    for detector_type, detector, _, _ in self.visual_detectors_by_cam.get(cam_index, ()):
+                        if detector.is_active:
                             try:
                                 vis_data = detector.process_frame(rgb_frame, timestamps[cam_index])
                                 if vis_data: vis_results[cam_index][detector_type] = vis_data
                             except Exception as process_e: print(f"ERROR: Processing frame with {detector_type} failed: {process_e}"); traceback.print_exc()
                 # Visualization
                 if self.show_combined_video:
+                    vis_frame_count += 1
+                    vis_check_frame = vis_frame_count % VIS_VISIBILITY_CHECK_FRAMES == 0
+                    if vis_window_shown and vis_check_frame:
+                        try: vis_visible = cv2.getWindowProperty(VIS_WINDOW_NAME, cv2.WND_PROP_VISIBLE) >= 1
+                        except cv2.error: vis_visible = True
                     display_frame = None; display_cam_index = next(iter(active_captures.keys()), None)
-                    if display_cam_index is not None and frames.get(display_cam_index) is not None:
-                        display_frame = cv2.flip(frames[display_cam_index].copy(), 1)
+                    # Skip drawing while the window is hidden/minimized, except on check frames: imshow there recreates a
+                    # window the user closed (as every frame's imshow used to), and the next check sees it again
+                    if (vis_visible or vis_check_frame) and display_cam_index is not None and frames.get(display_cam_index) is not None:
+                        # Mirror the raw frame straight into a reused buffer and draw on that (no extra copy)
+                        raw_frame = frames[display_cam_index]; flip_buf = flip_bufs.get(display_cam_index)
+                        if flip_buf is None or flip_buf.shape != raw_frame.shape: flip_bufs[display_cam_index] = flip_buf = np.empty_like(raw_frame)
+                        display_frame = cv2.flip(raw_frame, 1, dst=flip_buf)
                         h, w, _ = display_frame.shape
                         # Draw Face Results
                         if self.vis_settings.get('show_face') and 'face' in vis_results.get(display_cam_index, {}):
                              face_vis = vis_results[display_cam_index]['face']; landmark_drawing_object = face_vis.get('landmark_object')
-                             if landmark_drawing_object: mp_drawing.draw_landmarks(image=display_frame, landmark_list=landmark_drawing_object, connections=mp_face_mesh.FACEMESH_CONTOURS, landmark_drawing_spec=None, connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_contours_style())
-                             if face_vis: f_states = face_vis.get('states', {}); f_vals = face_vis.get('values', {}); text = f"F|T:{f_vals.get('head_tilt_angle', 0.0):.0f} M:{f_vals.get('mar', 0.0):.2f} E:{f_vals.get('avg_err', 0.0):.2f}"; cv2.putText(display_frame, text, (10, h-40), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1); f_active = [k.split('_')[0] for k,v in f_states.items() if v]; state_text = "Face: "+(",".join(f_active) if f_active else "None"); cv2.putText(display_frame, state_text, (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+                             if landmark_drawing_object: mp_drawing.draw_landmarks(image=display_frame, landmark_list=landmark_drawing_object, connections=face_contours, landmark_drawing_spec=None, connection_drawing_spec=face_contours_style)
+                             if face_vis: f_states = face_vis.get('states', {}); f_vals = face_vis.get('values', {}); text = f"F|T:{f_vals.get('head_tilt_angle', 0.0):.0f} M:{f_vals.get('mar', 0.0):.2f} E:{f_vals.get('avg_err', 0.0):.2f}"; cv2.putText(display_frame, text, (10, h-40), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1); state_text = _face_state_text(tuple(f_states.items())); cv2.putText(display_frame, state_text, (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
                         # Draw Hand Results
                         if self.vis_settings.get('show_hand') and 'hand' in vis_results.get(display_cam_index, {}):
                              hand_vis = vis_results[display_cam_index]['hand']
-                             if hand_vis: mp_drawing.draw_landmarks(image=display_frame, landmark_list=hand_vis, connections=mp_hands.HAND_CONNECTIONS, landmark_drawing_spec=None, connection_drawing_spec=mp_drawing_styles.get_default_hand_connections_style())
+                             if hand_vis: mp_drawing.draw_landmarks(image=display_frame, landmark_list=hand_vis, connections=hand_connections, landmark_drawing_spec=None, connection_drawing_spec=hand_connections_style)
                              hand_det = self.detectors.get('hand');
-                             if hand_det: stable_hand = hand_det._current_stable_gesture; cv2.putText(display_frame, f"Hand: {stable_hand}", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
-                        try: cv2.imshow('AccessiCommand Output', display_frame)
+                             if hand_det: stable_hand = hand_det.instance._current_stable_gesture; cv2.putText(display_frame, f"Hand: {stable_hand}", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+                        try: cv2.imshow(VIS_WINDOW_NAME, display_frame); vis_window_shown = True
                         except cv2.error as cv_err: print(f"WARN: imshow error: {cv_err}"); self.show_combined_video = False
                     try:
                         key = cv2.waitKey(1) & 0xFF
                         if key == ord('q'): self.is_running = False; break
                     except cv2.error as key_err: print(f"WARN: waitKey error: {key_err}"); self.show_combined_video = False
-                else: time.sleep(0.01)
         except Exception as loop_e: print(f"ERROR in Engine main loop: {loop_e}"); traceback.print_exc()
         finally:
              print("Engine: Exiting main processing loop...");
+             for grabber in grabbers.values(): grabber.stop()
              for cam_index, cap in active_captures.items():
                   if cap and cap.isOpened(): cap.release(); print(f"Engine: Camera {cam_index} released.")
              try: cv2.destroyAllWindows()
              except Exception: pass
-             self.is_running = False
+             self.is_running = False; self._event_sink.target = _ignore_event; self._stop_event.set()
 
 
     def start(self):
         # (Keep previous corrected start method)
         if self.is_running: print("Engine: Already running."); return
-        print("--- Engine Starting ---"); self.is_running = True
+        print("--- Engine Starting ---"); self.is_running = True; self._stop_event.clear()
+        self._start_action_worker(); self._event_sink.target = self.handle_event
         self._load_configuration(); self._initialize_detectors() # Reload/Re-init on start
         if 'voice' in self.detectors:
-            try: print("Engine: Starting voice detector..."); self.detectors['voice'].start()
+            try: print("Engine: Starting voice detector..."); self.detectors['voice'].start_fn()
             except Exception as e: print(f"ERROR starting voice: {e}")
         if self.visual_detectors_by_cam:
              print("Engine: Activating visual detectors...")
              for detectors_list in self.visual_detectors_by_cam.values():
-                  for detector in detectors_list:
-                       if hasattr(detector, 'start') and callable(detector.start):
-                           try: detector.start()
-                           except Exception as e: print(f"ERROR starting {detector.__class__.__name__}: {e}")
+                  for det in detectors_list:
+                       if det.start_fn:
+                           try: det.start_fn()
+                           except Exception as e: print(f"ERROR starting {det.instance.__class__.__name__}: {e}")
              print("Engine: Starting main processing loop thread...")
              self.main_loop_thread = threading.Thread(target=self._run_main_loop, daemon=True)
              self.main_loop_thread.start()
@@ -239,14 +415,17 @@ class Engine:
         """ Stops all detector threads and releases resources. """
         if not self.is_running and not self.detectors: print("Engine: Already stopped/no detectors."); return
         print("--- Engine Stopping ---"); was_running = self.is_running; self.is_running = False # Signal loops first
+        self._event_sink.target = _ignore_event
+        self._stop_event.set()
 
         # Stop Voice Detector Thread (with longer join timeout)
         if 'voice' in self.detectors:
-            voice_detector_instance = self.detectors.get('voice') # Use get for safety
-            if voice_detector_instance and hasattr(voice_detector_instance, 'stop'):
+            voice_det = self.detectors.get('voice') # Use get for safety
+            voice_detector_instance = voice_det.instance if voice_det else None
+            if voice_det and voice_det.stop_fn:
                 try:
                     print("Engine: Stopping voice detector...")
-                    voice_detector_instance.stop() # Sets internal running flag
+                    voice_det.stop_fn() # Sets internal running flag
 
                     if voice_detector_instance.thread and voice_detector_instance.thread.is_alive():
                         print("Engine: Waiting for voice detector thread join...")
@@ -270,10 +449,10 @@ class Engine:
         # Stop Visual Detector Models
         print("Engine: Stopping visual detector models...")
         stop_count = 0
-        for dtype, det_instance in self.detectors.items():
+        for dtype, det in self.detectors.items():
              if dtype == 'voice': continue
              try:
-                 if callable(getattr(det_instance, "stop", None)): det_instance.stop(); stop_count += 1
+                 if det.stop_fn: det.stop_fn(); stop_count += 1
                  else: print(f"WARN: {dtype} has no stop().")
              except Exception as e: print(f"ERROR stopping {dtype} model: {e}")
         print(f"Engine: Stopped {stop_count} visual models.")
@@ -285,6 +464,8 @@ class Engine:
              if cap and cap.isOpened(): cap.release(); #print(f"Engine: Camera {cam_index} released (stop).")
         self.capture_devices = {} # Clear captures dict
 
+        self._stop_action_worker(2.0) # After the detectors: nothing can queue new actions now
+
         if was_running or self.detectors: print("Engine: Stop sequence complete.")
     # --- END UPDATED stop ---
 
@@ -293,7 +474,7 @@ class Engine:
 # --- Integration Test Block ---
 if __name__ == '__main__':
     # (Keep as is)
-    if not _imports_ok: print("Exiting: Import errors."); sys.exit(1)
+    logging.basicConfig(level=logging.DEBUG if os.environ.get("ACCESSICOMMAND_DEBUG") else logging.INFO, format="%(message)s")
     print("--- Running Engine Directly (Integration Test) ---")
     current_script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(os.path.dirname(current_script_dir))
@@ -308,10 +489,9 @@ if __name__ == '__main__':
     else: print(f"\nEngine running: {list(engine.detectors.keys())}. Perform actions...")
     print("Press Ctrl+C in terminal to stop.")
     try:
-        if engine.main_loop_thread:
-             while engine.main_loop_thread.is_alive(): engine.main_loop_thread.join(timeout=0.5)
-        else:
-             while engine.is_running: time.sleep(1)
+        # Both waits block without polling and are still interruptible by Ctrl+C
+        if engine.main_loop_thread: engine.main_loop_thread.join()
+        else: engine._stop_event.wait()
     except KeyboardInterrupt: print("\nCtrl+C detected. Stopping engine...")
     except Exception as main_e: print(f"\nERROR in main test loop: {main_e}"); traceback.print_exc()
     finally: engine.stop(); print("--- Engine Test Finished ---")
\ No newline at end of file
@@ -0,0 +1,183 @@
+# accessicommand/detectors/_facial_kernels.py
+# Numeric core of FacialDetector.process_frame, compiled with Numba when it is installed.
+import math
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # Optional dependency: without Numba the kernels run as plain Python (same results, slower)
+    NUMBA_AVAILABLE = False
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs: return args[0]
+        return lambda func: func
+
+
+# --- Feature geometry layout ---
+# Rows of the pair table: every distance face_features needs, computed in one loop
+D_LEFT_EYE_V1 = 0; D_LEFT_EYE_V2 = 1; D_LEFT_EYE_H = 2; D_RIGHT_EYE_V1 = 3; D_RIGHT_EYE_V2 = 4; D_RIGHT_EYE_H = 5
+D_MOUTH_V = 6; D_MOUTH_H = 7; D_LEFT_BROW_H = 8; D_RIGHT_BROW_H = 9
+N_DISTANCES = 10
+# Rows of the brow/eye table: (brow point, eye point) whose vertical gap is each side's ERR numerator
+R_LEFT = 0; R_RIGHT = 1
+
+
+def build_geometry_tables(left_eye, right_eye, mouth, left_brow, right_brow):
+    """
+    Builds the landmark pair table (N_DISTANCES, 2) and brow/eye table (2, 2) face_features reads,
+    both int32. `mouth` is [upper lip, lower lip, left corner, right corner]; the eye/brow lists use
+    FacialDetector's *_INDICES order. Called once at class definition, not per frame.
+    """
+    pairs = np.empty((N_DISTANCES, 2), dtype=np.int32)
+    for base, eye in ((D_LEFT_EYE_V1, left_eye), (D_RIGHT_EYE_V1, right_eye)):
+        pairs[base] = (eye[1], eye[5]); pairs[base + 1] = (eye[2], eye[4]); pairs[base + 2] = (eye[0], eye[3])
+    pairs[D_MOUTH_V] = (mouth[0], mouth[1]); pairs[D_MOUTH_H] = (mouth[2], mouth[3])
+    pairs[D_LEFT_BROW_H] = (left_brow[2], left_brow[4]); pairs[D_RIGHT_BROW_H] = (right_brow[2], right_brow[4])
+    brow_eye = np.array([(left_brow[2], left_eye[1]), (right_brow[2], right_eye[1])], dtype=np.int32)
+    return pairs, brow_eye
+
+
+@njit(cache=True, fastmath=True)
+def _ear(d, v1, v2, h):
+    if d[h] == 0.0: return 1.0
+    return (d[v1] + d[v2]) / (2.0 * d[h])
+
+@njit(cache=True, fastmath=True)
+def _err(lm, brow_eye, row, hd):
+    if hd == 0.0: return 0.0
+    return abs(lm[brow_eye[row, 0], 1] - lm[brow_eye[row, 1], 1]) / hd
+
+
+@njit('Tuple((f4, f4, f4, f4, f4))(f4[:, ::1], i4[:, ::1], i4[:, ::1], i4, i4, i4, i4)', cache=True, fastmath=True)
+def face_features(lm, pairs, brow_eye, chin, forehead, frame_width, frame_height):
+    """
+    Computes the per-frame facial features from the (N, 2) float32 normalized landmark (x, y) array.
+    `pairs`/`brow_eye` come from build_geometry_tables.
+
+    Returns:
+        tuple: (ear_left, ear_right, mar, avg_err, head_tilt_deg)
+    """
+    # One pass over every landmark pair. EAR/MAR/ERR are image-plane ratios, so distances are 2D:
+    # MediaPipe's relative z is the noisiest coordinate and only skewed them
+    d_sq = np.empty(N_DISTANCES, dtype=np.float32)
+    for k in range(N_DISTANCES):
+        a = pairs[k, 0]; b = pairs[k, 1]
+        dx = lm[a, 0] - lm[b, 0]; dy = lm[a, 1] - lm[b, 1]
+        d_sq[k] = dx * dx + dy * dy
+    d = np.sqrt(d_sq)
+    ear_left = _ear(d, D_LEFT_EYE_V1, D_LEFT_EYE_V2, D_LEFT_EYE_H); ear_right = _ear(d, D_RIGHT_EYE_V1, D_RIGHT_EYE_V2, D_RIGHT_EYE_H)
+    # Ratio of two distances == sqrt of the ratio of their squares
+    mar = math.sqrt(d_sq[D_MOUTH_V] / d_sq[D_MOUTH_H]) if d_sq[D_MOUTH_H] != 0.0 else 0.0
+    avg_err = (_err(lm, brow_eye, R_LEFT, d[D_LEFT_BROW_H]) + _err(lm, brow_eye, R_RIGHT, d[D_RIGHT_BROW_H])) / 2.0
+    # Head tilt: pixel-space angle straight from the normalized coords. x and y are scaled by different
+    # factors (aspect ratio), so they don't cancel; atan2 already covers dy == 0 (+-90, or 0 for 0/0)
+    tilt = math.degrees(math.atan2((lm[forehead, 0] - lm[chin, 0]) * frame_width, (lm[forehead, 1] - lm[chin, 1]) * frame_height))
+    return ear_left, ear_right, mar, avg_err, tilt
+
+
+# --- Detector state layout (one STATE_DTYPE record owned by FacialDetector, updated in place by update_face_state) ---
+# counters (int32): consecutive-frame counters
+C_LEFT_BLINK = 0; C_RIGHT_BLINK = 1; C_MOUTH = 2; C_BOTH_EYES = 3; C_EYEBROW = 4; C_TILT_LEFT = 5; C_TILT_RIGHT = 6
+N_COUNTERS = 7
+# int_thresholds (int32): frames a counter must reach
+T_BLINK = 0; T_MOUTH = 1; T_BOTH_EYES = 2; T_EYEBROW = 3; T_TILT = 4
+N_INT_THRESHOLDS = 5
+# float_thresholds (float64)
+F_EAR = 0; F_MAR = 1; F_ERR = 2; F_TILT_LEFT_MIN = 3; F_TILT_LEFT_MAX = 4; F_TILT_RIGHT_MIN = 5; F_TILT_RIGHT_MAX = 6; F_BLINK_COOLDOWN = 7
+N_FLOAT_THRESHOLDS = 8
+# states (uint8 0/1): this frame's states; the two *_BLINK entries are one-frame blink flags
+S_LEFT_EYE_CLOSED = 0; S_RIGHT_EYE_CLOSED = 1; S_MOUTH_OPEN = 2; S_BOTH_EYES_CLOSED = 3; S_EYEBROWS_RAISED = 4
+S_TILT_LEFT = 5; S_TILT_RIGHT = 6; S_LEFT_BLINK = 7; S_RIGHT_BLINK = 8
+N_STATES = 9
+# prev_states (uint8 0/1): raw "eye closed" flags from the last frame, then the last emitted value of each
+# START/STOP state (same positions as the matching S_* entries)
+P_LEFT_CLOSED_RAW = 0; P_RIGHT_CLOSED_RAW = 1
+N_PREV_STATES = 7
+# last_blink_times (float64): [left, right]
+# Event bitmask returned by update_face_state/transition_mask: bit 0/1 = left/right blink, then a
+# (START, STOP) bit pair per edge state in S_MOUTH_OPEN..S_TILT_RIGHT order
+B_LEFT_BLINK = 0; B_RIGHT_BLINK = 1; B_EDGE_BASE = 2
+N_EVENT_BITS = B_EDGE_BASE + 2 * (S_TILT_RIGHT - S_MOUTH_OPEN + 1)
+# All mutable per-detector state in one record, so update_face_state takes a single array argument.
+# Flags are uint8 rather than bool: Numba can't type bool sub-arrays inside a record.
+STATE_DTYPE = np.dtype([('counters', np.int32, N_COUNTERS), ('prev_states', np.uint8, N_PREV_STATES),
+                        ('last_blink_times', np.float64, 2), ('states', np.uint8, N_STATES)])
+
+
+@njit(cache=True)
+def _step(count, active, limit):
+    """Saturating counter: +1 up to limit while active, -1 down to 0 otherwise. Branchless (bool -> +-1)."""
+    return min(max(count + 2 * active - 1, 0), limit)
+
+
+@njit(cache=True)
+def update_face_state(ear_left, ear_right, mar, avg_err, tilt, now, state, int_thresholds, float_thresholds):
+    """
+    Advances the per-frame counters/blink timers from this frame's features and writes the resulting
+    states into the record. `state` is a 1-element STATE_DTYPE array, modified in place.
+
+    Returns:
+        int: Event bitmask for this frame (see transition_mask).
+    """
+    rec = state[0]
+    counters = rec['counters']; prev_states = rec['prev_states']; last_blink_times = rec['last_blink_times']; states = rec['states']
+    # The frame is mirrored, so the person's left eye is the image's right eye (and vice versa)
+    left_now = ear_right < float_thresholds[F_EAR]; right_now = ear_left < float_thresholds[F_EAR]
+    counters[C_LEFT_BLINK] = (counters[C_LEFT_BLINK] + 1) * left_now # Reset to 0 when open
+    counters[C_RIGHT_BLINK] = (counters[C_RIGHT_BLINK] + 1) * right_now
+    left_closed = counters[C_LEFT_BLINK] >= int_thresholds[T_BLINK]
+    right_closed = counters[C_RIGHT_BLINK] >= int_thresholds[T_BLINK]
+    cooldown = float_thresholds[F_BLINK_COOLDOWN]
+    left_blink = left_closed and not prev_states[P_LEFT_CLOSED_RAW] and now - last_blink_times[0] > cooldown and not right_now
+    right_blink = right_closed and not prev_states[P_RIGHT_CLOSED_RAW] and now - last_blink_times[1] > cooldown and not left_now
+    if left_blink: last_blink_times[0] = now
+    if right_blink: last_blink_times[1] = now
+    prev_states[P_LEFT_CLOSED_RAW] = left_now; prev_states[P_RIGHT_CLOSED_RAW] = right_now
+
+    counters[C_MOUTH] = _step(counters[C_MOUTH], mar > float_thresholds[F_MAR], int_thresholds[T_MOUTH])
+    counters[C_BOTH_EYES] = _step(counters[C_BOTH_EYES], left_now and right_now, int_thresholds[T_BOTH_EYES])
+    counters[C_EYEBROW] = _step(counters[C_EYEBROW], avg_err > float_thresholds[F_ERR], int_thresholds[T_EYEBROW])
+    # Tilting one way resets the other side's counter; neither way decays both (left range wins an overlap)
+    tilt_limit = int_thresholds[T_TILT]
+    in_left = float_thresholds[F_TILT_LEFT_MIN] >= tilt >= float_thresholds[F_TILT_LEFT_MAX]
+    in_right = (not in_left) and float_thresholds[F_TILT_RIGHT_MIN] <= tilt <= float_thresholds[F_TILT_RIGHT_MAX]
+    counters[C_TILT_LEFT] = _step(counters[C_TILT_LEFT], in_left, tilt_limit) * (not in_right)
+    counters[C_TILT_RIGHT] = _step(counters[C_TILT_RIGHT], in_right, tilt_limit) * (not in_left)
+
+    states[S_LEFT_EYE_CLOSED] = left_closed; states[S_RIGHT_EYE_CLOSED] = right_closed
+    states[S_MOUTH_OPEN] = counters[C_MOUTH] >= int_thresholds[T_MOUTH]
+    states[S_BOTH_EYES_CLOSED] = counters[C_BOTH_EYES] >= int_thresholds[T_BOTH_EYES]
+    states[S_EYEBROWS_RAISED] = counters[C_EYEBROW] >= int_thresholds[T_EYEBROW]
+    states[S_TILT_LEFT] = counters[C_TILT_LEFT] >= tilt_limit; states[S_TILT_RIGHT] = counters[C_TILT_RIGHT] >= tilt_limit
+    states[S_LEFT_BLINK] = left_blink; states[S_RIGHT_BLINK] = right_blink
+    return transition_mask(states, prev_states)
+
+
+@njit(cache=True)
+def transition_mask(states, prev_states):
+    """
+    Packs this frame's events into a bitmask (B_* layout) and records the new edge states in
+    prev_states. A blink bit is set only when the other eye didn't blink on the same frame.
+    """
+    mask = 0
+    if states[S_LEFT_BLINK] and not states[S_RIGHT_BLINK]: mask |= 1 << B_LEFT_BLINK
+    if states[S_RIGHT_BLINK] and not states[S_LEFT_BLINK]: mask |= 1 << B_RIGHT_BLINK
+    for k in range(S_TILT_RIGHT - S_MOUTH_OPEN + 1):
+        i = S_MOUTH_OPEN + k
+        if states[i] != prev_states[i]:
+            mask |= 1 << (B_EDGE_BASE + 2 * k + (0 if states[i] else 1)); prev_states[i] = states[i]
+    return mask
+
+
+def warm_up():
+    """
+    Compiles (or loads from Numba's on-disk cache) the lazily-typed kernels with the argument types
+    FacialDetector passes, so the first processed frame doesn't stall on JIT compilation.
+    face_features has an explicit signature and is compiled at import. No-op without Numba.
+    """
+    if not NUMBA_AVAILABLE: return
+    state = np.zeros(1, dtype=STATE_DTYPE)
+    update_face_state(1.0, 1.0, 0.0, 0.0, 0.0, 0.0, state,
+                      np.ones(N_INT_THRESHOLDS, dtype=np.int32), np.zeros(N_FLOAT_THRESHOLDS, dtype=np.float64))
+    transition_mask(state['states'][0], state['prev_states'][0])
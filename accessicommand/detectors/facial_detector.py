@@ -1,15 +1,12 @@
 # accessicommand/detectors/facial_detector.py
 import cv2
-import mediapipe as mp
+# mediapipe is imported in start(): importing this module (e.g. for the event names) stays cheap
 import time
-import math
+import numpy as np
 # REMOVED: import threading
 import traceback
-
-# --- MediaPipe Setup ---
-mp_face_mesh = mp.solutions.face_mesh
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
+from accessicommand.detectors import _facial_kernels as fk
+from accessicommand.detectors._facial_kernels import build_geometry_tables, face_features, update_face_state, transition_mask
 
 # --- Default Configuration Constants ---
 DEFAULT_EAR_THRESHOLD = 0.20
@@ -25,6 +22,18 @@ DEFAULT_CONSEC_FRAMES_MOUTH = 3
 DEFAULT_CONSEC_FRAMES_EYEBROW = 3
 DEFAULT_CONSEC_FRAMES_HEAD_TILT = 2
 DEFAULT_BLINK_COOLDOWN = 0.3
+DEFAULT_DETECTION_WIDTH = 480 # Frames wider than this are downscaled before FaceMesh; None/0 disables
+# Static-scene gating: skip FaceMesh when a tiny thumbnail barely changed since the last detection.
+# Off by default (0): a short blink hardly moves a whole-frame thumbnail and could be missed.
+DEFAULT_STATIC_SKIP_THRESHOLD = 0.0 # Mean abs thumbnail difference (0-255) below which a frame counts as static
+STATIC_SKIP_MAX_AGE = 30 # Re-run detection at least every N frames regardless
+STATIC_THUMB_SIZE = (64, 36) # (w, h)
+DEFAULT_INFERENCE_STRIDE = 1 # Run FaceMesh on every Nth frame, reusing the last landmarks in between (1 = every frame)
+# Inference backend: "solutions" = mp.solutions FaceMesh (CPU); "tasks" = Tasks FaceLandmarker, which can use
+# the GPU delegate but needs a downloaded face_landmarker.task model file. Falls back to "solutions" on failure.
+DEFAULT_BACKEND = "solutions"
+DEFAULT_MODEL_ASSET_PATH = "face_landmarker.task"
+DEFAULT_USE_GPU = True
 
 # --- Event Name Constants ---
 LEFT_BLINK_EVENT = "LEFT_BLINK"; RIGHT_BLINK_EVENT = "RIGHT_BLINK"
@@ -33,10 +42,56 @@ BOTH_EYES_CLOSED_START_EVENT = "BOTH_EYES_CLOSED_START"; BOTH_EYES_CLOSED_STOP_E
 EYEBROWS_RAISED_START_EVENT = "EYEBROWS_RAISED_START"; EYEBROWS_RAISED_STOP_EVENT = "EYEBROWS_RAISED_STOP"
 HEAD_TILT_LEFT_START_EVENT = "HEAD_TILT_LEFT_START"; HEAD_TILT_LEFT_STOP_EVENT = "HEAD_TILT_LEFT_STOP"
 HEAD_TILT_RIGHT_START_EVENT = "HEAD_TILT_RIGHT_START"; HEAD_TILT_RIGHT_STOP_EVENT = "HEAD_TILT_RIGHT_STOP"
+# Event for each bit of the kernel's event bitmask (bit layout in _facial_kernels)
+EVENT_BY_BIT = (LEFT_BLINK_EVENT, RIGHT_BLINK_EVENT,
+                MOUTH_OPEN_START_EVENT, MOUTH_OPEN_STOP_EVENT, BOTH_EYES_CLOSED_START_EVENT, BOTH_EYES_CLOSED_STOP_EVENT,
+                EYEBROWS_RAISED_START_EVENT, EYEBROWS_RAISED_STOP_EVENT, HEAD_TILT_LEFT_START_EVENT, HEAD_TILT_LEFT_STOP_EVENT,
+                HEAD_TILT_RIGHT_START_EVENT, HEAD_TILT_RIGHT_STOP_EVENT)
+
+
+class _FaceLandmarkerAdapter:
+    """ Wraps a Tasks-API FaceLandmarker (VIDEO mode) behind the FaceMesh interface FacialDetector uses:
+    process(rgb_frame) -> object with .multi_face_landmarks[i].landmark, and close(). """
+    def __init__(self, model_asset_path, use_gpu):
+        import mediapipe as mp # Deferred import (see top of module)
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python.vision import FaceLandmarker, FaceLandmarkerOptions, RunningMode
+        from mediapipe.framework.formats import landmark_pb2
+        self._mp = mp; self._landmark_pb2 = landmark_pb2
+        delegate = BaseOptions.Delegate.GPU if use_gpu else BaseOptions.Delegate.CPU
+        self._landmarker = FaceLandmarker.create_from_options(FaceLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_asset_path, delegate=delegate),
+            running_mode=RunningMode.VIDEO, num_faces=1,
+            min_face_detection_confidence=0.5, min_tracking_confidence=0.5))
+        self._ts_ms = 0
+
+    def process(self, rgb_frame):
+        # VIDEO mode requires strictly increasing timestamps
+        self._ts_ms = max(self._ts_ms + 1, int(time.monotonic() * 1000))
+        result = self._landmarker.detect_for_video(self._mp.Image(image_format=self._mp.ImageFormat.SRGB, data=rgb_frame), self._ts_ms)
+        # Same proto type FaceMesh returns, so the landmark fill and the Engine's drawing work unchanged
+        NormalizedLandmark = self._landmark_pb2.NormalizedLandmark
+        faces = [self._landmark_pb2.NormalizedLandmarkList(landmark=[NormalizedLandmark(x=p.x, y=p.y, z=p.z) for p in face])
+                 for face in result.face_landmarks]
+        return _LandmarkerResults(faces or None)
+
+    def close(self): self._landmarker.close()
+
+class _LandmarkerResults:
+    __slots__ = ('multi_face_landmarks',)
+    def __init__(self, multi_face_landmarks): self.multi_face_landmarks = multi_face_landmarks
 
 
 class FacialDetector:
-    """ Detects facial gestures from a provided frame and emits events. """
+    """ Detects facial gestures from a provided frame and emits events.
+    Events are emitted as event_handler("face", <one of the *_EVENT str constants above>). """
+    # Fixed attribute set: no per-instance __dict__, and slot access for the ~30 loads per frame
+    __slots__ = ('event_handler', 'ear_threshold', 'mar_threshold', 'err_threshold', 'both_eyes_closed_frames',
+                 'head_tilt_left_min', 'head_tilt_left_max', 'head_tilt_right_min', 'head_tilt_right_max',
+                 'consec_frames_blink', 'consec_frames_mouth', 'consec_frames_eyebrow', 'consec_frames_head_tilt', 'blink_cooldown',
+                 '_int_thresholds', '_float_thresholds', 'detection_width', '_small_buf', '_lm_buf',
+                 'static_skip_threshold', '_thumb_buf', '_prev_thumb', '_last_results', '_results_age', 'inference_stride', '_frame_idx', 'backend', 'model_asset_path', 'use_gpu',
+                 'face_mesh', 'is_active', '_state', '_prev_states', '_states')
 
     # --- Landmark Indices ---
     LEFT_EYE_INDICES = [362, 385, 387, 263, 373, 380]; RIGHT_EYE_INDICES = [33, 160, 158, 133, 153, 144]
@@ -44,6 +99,12 @@ class FacialDetector:
     LEFT_EYEBROW_INDICES = [70, 63, 105, 66, 107]; RIGHT_EYEBROW_INDICES = [336, 296, 334, 293, 300]
     CHIN_INDEX = 152; FOREHEAD_INDEX = 10
     LANDMARKS_TO_DRAW = LEFT_EYE_INDICES + RIGHT_EYE_INDICES + MOUTH_CORNER_INDICES + MOUTH_VERTICAL_INDICES + LEFT_EYEBROW_INDICES + RIGHT_EYEBROW_INDICES
+    # Landmark-row tables face_features computes every distance from (layouts in _facial_kernels)
+    _PAIR_TABLE, _BROW_EYE_TABLE = build_geometry_tables(LEFT_EYE_INDICES, RIGHT_EYE_INDICES, MOUTH_VERTICAL_INDICES + MOUTH_CORNER_INDICES,
+                                                         LEFT_EYEBROW_INDICES, RIGHT_EYEBROW_INDICES)
+    # The only landmark rows face_features reads; _fill_landmarks copies just these out of the proto
+    _USED_ROWS = tuple(sorted(set(LANDMARKS_TO_DRAW + [CHIN_INDEX, FOREHEAD_INDEX]))); _USED_IDX = np.array(_USED_ROWS, dtype=np.intp)
+    NUM_FACE_LANDMARKS = 468 # refine_landmarks=False
 
     def __init__(self, event_handler,
                  ear_threshold=DEFAULT_EAR_THRESHOLD,
@@ -58,7 +119,13 @@ class FacialDetector:
                  consec_frames_mouth=DEFAULT_CONSEC_FRAMES_MOUTH,
                  consec_frames_eyebrow=DEFAULT_CONSEC_FRAMES_EYEBROW,
                  consec_frames_head_tilt=DEFAULT_CONSEC_FRAMES_HEAD_TILT,
-                 blink_cooldown=DEFAULT_BLINK_COOLDOWN
+                 blink_cooldown=DEFAULT_BLINK_COOLDOWN,
+                 detection_width=DEFAULT_DETECTION_WIDTH,
+                 static_skip_threshold=DEFAULT_STATIC_SKIP_THRESHOLD,
+                 inference_stride=DEFAULT_INFERENCE_STRIDE,
+                 backend=DEFAULT_BACKEND,
+                 model_asset_path=DEFAULT_MODEL_ASSET_PATH,
+                 use_gpu=DEFAULT_USE_GPU
                  # REMOVED: camera_index, show_video (Engine handles visualization/camera)
                 ):
         self.event_handler = event_handler if callable(event_handler) else self._default_handler
@@ -72,6 +139,18 @@ class FacialDetector:
         self.consec_frames_blink = consec_frames_blink; self.consec_frames_mouth = consec_frames_mouth
         self.consec_frames_eyebrow = consec_frames_eyebrow; self.consec_frames_head_tilt = consec_frames_head_tilt
         self.blink_cooldown = blink_cooldown
+        # Same thresholds packed for update_face_state (layouts in _facial_kernels)
+        self._int_thresholds = np.array([consec_frames_blink, consec_frames_mouth, both_eyes_closed_frames, consec_frames_eyebrow, consec_frames_head_tilt], dtype=np.int32)
+        self._float_thresholds = np.array([ear_threshold, mar_threshold, err_threshold, head_tilt_left_min, head_tilt_left_max, head_tilt_right_min, head_tilt_right_max, blink_cooldown], dtype=np.float64)
+        self.detection_width = detection_width
+        self._small_buf = None # Preallocated downscaled frame for FaceMesh, (re)built when the size changes
+        self._lm_buf = np.zeros((self.NUM_FACE_LANDMARKS, 2), dtype=np.float32) # Landmark (x, y) rows, filled in place every frame
+        self.static_skip_threshold = static_skip_threshold or 0.0
+        self._thumb_buf = np.empty((STATIC_THUMB_SIZE[1], STATIC_THUMB_SIZE[0], 3), dtype=np.uint8)
+        self._prev_thumb = None # Thumbnail of the last frame FaceMesh actually ran on
+        self._last_results = None; self._results_age = 0
+        self.inference_stride = max(1, int(inference_stride or 1)); self._frame_idx = 0
+        self.backend = backend; self.model_asset_path = model_asset_path; self.use_gpu = use_gpu
 
         # MediaPipe Initialization
         self.face_mesh = None # Initialized in start()
@@ -79,52 +158,74 @@ class FacialDetector:
         # State Variables
         self.is_active = False # Flag if detector processing is enabled
         self._reset_states()
+        fk.warm_up() # JIT the state kernels now rather than on the first frame
 
         print("--- Facial Detector Initialized (Configured) ---")
 
     def _reset_states(self):
         """Resets internal states."""
-        self._prev_mouth_open_state = False; self._prev_eyebrows_raised_state = False
-        self._prev_head_tilt_left_state = False; self._prev_head_tilt_right_state = False
-        self._prev_both_eyes_closed_state = False; self._left_eye_previously_closed = False
-        self._right_eye_previously_closed = False; self._last_left_blink_time = 0
-        self._last_right_blink_time = 0; self._mouth_open_counter = 0
-        self._eyebrow_raise_counter = 0; self._head_tilt_left_counter = 0
-        self._head_tilt_right_counter = 0; self._both_eyes_closed_counter = 0
-        self._left_blink_counter = 0; self._right_blink_counter = 0
+        # One STATE_DTYPE record, updated in place by update_face_state (layout in _facial_kernels);
+        # _states/_prev_states are views into it for the no-face path and visualization
+        self._state = np.zeros(1, dtype=fk.STATE_DTYPE)
+        self._states = self._state['states'][0]; self._prev_states = self._state['prev_states'][0]
 
     def _default_handler(self, detector_type, event_data): pass
 
-    # --- Calculation Methods (Keep as is) ---
-    def _calculate_distance(self, p1, p2): return math.sqrt((p1.x - p2.x)**2 + (p1.y - p2.y)**2 + (p1.z - p2.z)**2)
-    def _calculate_ear(self, eye_landmarks):
-        try: v1=self._calculate_distance(eye_landmarks[1], eye_landmarks[5]); v2=self._calculate_distance(eye_landmarks[2], eye_landmarks[4]); h=self._calculate_distance(eye_landmarks[0], eye_landmarks[3]); return (v1 + v2) / (2.0 * h) if h!=0 else 1.0
-        except IndexError: return 1.0
-    def _calculate_mar(self, landmarks):
-        try: ml=landmarks[self.MOUTH_CORNER_INDICES[0]]; mr=landmarks[self.MOUTH_CORNER_INDICES[1]]; lu=landmarks[self.MOUTH_VERTICAL_INDICES[0]]; ll=landmarks[self.MOUTH_VERTICAL_INDICES[1]]; vd=self._calculate_distance(lu,ll); hd=self._calculate_distance(ml,mr); return vd/hd if hd!=0 else 0.0
-        except IndexError: return 0.0
-    def _calculate_err(self, landmarks, eyebrow_indices, eye_indices):
-         try: bm=landmarks[eyebrow_indices[2]]; bo=landmarks[eyebrow_indices[4]]; et=landmarks[eye_indices[1]]; vd=abs(bm.y - et.y); hd=self._calculate_distance(bm,bo); return vd/hd if hd!=0 else 0.0
-         except IndexError: return 0.0
-    def _calculate_head_tilt(self, landmarks, frame_width, frame_height): # Keep pixel version
-        try:
-            chin=landmarks[self.CHIN_INDEX]; fh=landmarks[self.FOREHEAD_INDEX]
-            cx, cy = int(chin.x*frame_width), int(chin.y*frame_height); fx, fy = int(fh.x*frame_width), int(fh.y*frame_height)
-            dx=fx-cx; dy=fy-cy
-            if dy == 0: return 90.0 if dx>0 else -90.0 if dx<0 else 0.0
-            return math.degrees(math.atan2(dx, dy))
-        except IndexError: return 0.0
+    # --- Calculation Methods ---
+    # The geometry itself (EAR/MAR/ERR/tilt) lives in _facial_kernels.face_features (Numba-compiled when available)
+    def _fill_landmarks(self, landmarks):
+        """Copies the landmarks face_features needs into the preallocated (N, 2) buffer and returns it.
+        Rows outside _USED_IDX are never read and keep stale values."""
+        buf = self._lm_buf
+        buf[self._USED_IDX] = [(p.x, p.y) for p in map(landmarks.__getitem__, self._USED_ROWS)]
+        return buf
+
+    def _run_face_mesh(self, frame, frame_width, frame_height):
+        """Runs FaceMesh on the (optionally downscaled) RGB frame and returns its results."""
+        # FaceMesh accuracy plateaus well below webcam resolution; landmarks are normalized, so the
+        # math below is unchanged (head tilt still uses the full frame's dimensions/aspect ratio)
+        detect_frame = frame
+        if self.detection_width and frame_width > self.detection_width:
+            small_h = int(frame_height * self.detection_width / frame_width)
+            if self._small_buf is None or self._small_buf.shape[:2] != (small_h, self.detection_width):
+                self._small_buf = np.empty((small_h, self.detection_width, 3), dtype=frame.dtype)
+            detect_frame = cv2.resize(frame, (self.detection_width, small_h), dst=self._small_buf, interpolation=cv2.INTER_AREA)
+        # Only our own resize buffer is toggled (read-only lets MediaPipe skip a copy); a frame passed in
+        # as-is belongs to the caller, which hands it over read-only already (see Engine._run_main_loop)
+        if detect_frame is frame: return self.face_mesh.process(detect_frame)
+        detect_frame.flags.writeable = False
+        results = self.face_mesh.process(detect_frame)
+        detect_frame.flags.writeable = True
+        return results
+
+    def _is_static_frame(self, frame):
+        """True if a thumbnail of frame barely differs from the one FaceMesh last ran on (and that result is fresh)."""
+        thumb = cv2.resize(frame, STATIC_THUMB_SIZE, dst=self._thumb_buf, interpolation=cv2.INTER_NEAREST)
+        if self._prev_thumb is not None and self._last_results is not None and self._results_age < STATIC_SKIP_MAX_AGE and \
+           cv2.norm(thumb, self._prev_thumb, cv2.NORM_L1) / thumb.size < self.static_skip_threshold:
+            return True
+        if self._prev_thumb is None: self._prev_thumb = np.empty_like(thumb)
+        np.copyto(self._prev_thumb, thumb)
+        return False
 
 # --- NEW: Process Frame Method ---
     def process_frame(self, frame, frame_timestamp):
-        """Processes a single frame to detect gestures and emit events."""
+        """Processes a single frame to detect gestures and emit events.
+        frame_timestamp is in seconds on a monotonic clock (the Engine uses time.monotonic()); only
+        differences between timestamps are used, for the blink cooldown."""
         if not self.is_active or self.face_mesh is None:
             return None
 
         frame_height, frame_width, _ = frame.shape
-        frame.flags.writeable = False
-        results = self.face_mesh.process(frame) # Process the RGB frame passed in
-        frame.flags.writeable = True
+        # Strided frames reuse the last landmarks; counters still advance once per frame, so the
+        # consec_frames_* holds keep their meaning (a stride of N just samples the face N times less often)
+        if self._last_results is not None and self._frame_idx % self.inference_stride:
+            results = self._last_results; self._results_age += 1
+        elif self.static_skip_threshold > 0 and self._is_static_frame(frame):
+            results = self._last_results; self._results_age += 1 # Static scene: reuse the last landmarks
+        else:
+            results = self._run_face_mesh(frame, frame_width, frame_height); self._last_results = results; self._results_age = 0
+        self._frame_idx += 1
 
         # Defaults for this frame
         ear_left_val, ear_right_val = 1.0, 1.0
@@ -135,73 +236,20 @@ class FacialDetector:
         landmarks = face_landmarks_object.landmark if face_landmarks_object else None
         # ------------------------------------------------
 
-        # Local state vars
-        left_eye_closed_state, right_eye_closed_state = False, False
-        mouth_open_state, eyebrows_raised_state = False, False
-        head_tilt_left_state, head_tilt_right_state = False, False
-        both_eyes_closed_state = False
-        left_eye_blinked, right_eye_blinked = False, False
-
+        st = self._states
         if landmarks: # Proceed only if landmarks were extracted
-            # Calculations using the 'landmarks' list
-            person_left_eye_points = [landmarks[i] for i in self.LEFT_EYE_INDICES]
-            person_right_eye_points = [landmarks[i] for i in self.RIGHT_EYE_INDICES]
-            ear_left_val = self._calculate_ear(person_left_eye_points)
-            ear_right_val = self._calculate_ear(person_right_eye_points)
-            mar_val = self._calculate_mar(landmarks)
-            err_left = self._calculate_err(landmarks, self.LEFT_EYEBROW_INDICES, self.LEFT_EYE_INDICES)
-            err_right = self._calculate_err(landmarks, self.RIGHT_EYEBROW_INDICES, self.RIGHT_EYE_INDICES)
-            avg_err = (err_left + err_right) / 2.0
-            head_tilt_angle = self._calculate_head_tilt(landmarks, frame_width, frame_height)
-
-            # State Update & Event Emission logic (keep as is)
-            # ... (all the if/else blocks for blinks, mouth, eyes, brows, tilt) ...
-            is_left_closed_now = ear_right_val < self.ear_threshold
-            if is_left_closed_now: self._left_blink_counter += 1; 
-            else: self._left_blink_counter = 0
-            left_eye_closed_state = self._left_blink_counter >= self.consec_frames_blink
-            if left_eye_closed_state and not self._left_eye_previously_closed and current_time - self._last_left_blink_time > self.blink_cooldown and not is_right_closed_now: left_eye_blinked = True; self._last_left_blink_time = current_time
-            self._left_eye_previously_closed = is_left_closed_now
-
-            is_right_closed_now = ear_left_val < self.ear_threshold
-            if is_right_closed_now: self._right_blink_counter += 1; 
-            else: self._right_blink_counter = 0
-            right_eye_closed_state = self._right_blink_counter >= self.consec_frames_blink
-            if right_eye_closed_state and not self._right_eye_previously_closed and current_time - self._last_right_blink_time > self.blink_cooldown and not is_left_closed_now: right_eye_blinked = True; self._last_right_blink_time = current_time
-            self._right_eye_previously_closed = is_right_closed_now
-
-            is_mouth_open_now = mar_val > self.mar_threshold
-            if is_mouth_open_now: self._mouth_open_counter = min(self.consec_frames_mouth, self._mouth_open_counter + 1); 
-            else: self._mouth_open_counter = max(0, self._mouth_open_counter - 1)
-            mouth_open_state = self._mouth_open_counter >= self.consec_frames_mouth
-
-            are_both_eyes_closed_now = is_left_closed_now and is_right_closed_now
-            if are_both_eyes_closed_now: self._both_eyes_closed_counter = min(self.both_eyes_closed_frames, self._both_eyes_closed_counter + 1); 
-            else: self._both_eyes_closed_counter = max(0, self._both_eyes_closed_counter - 1)
-            both_eyes_closed_state = self._both_eyes_closed_counter >= self.both_eyes_closed_frames
-
-            are_eyebrows_raised_now = avg_err > self.err_threshold
-            if are_eyebrows_raised_now: self._eyebrow_raise_counter = min(self.consec_frames_eyebrow, self._eyebrow_raise_counter + 1); 
-            else: self._eyebrow_raise_counter = max(0, self._eyebrow_raise_counter - 1)
-            eyebrows_raised_state = self._eyebrow_raise_counter >= self.consec_frames_eyebrow
-
-            is_tilt_left_now = self.head_tilt_left_min >= head_tilt_angle >= self.head_tilt_left_max
-            is_tilt_right_now = self.head_tilt_right_min <= head_tilt_angle <= self.head_tilt_right_max
-            if is_tilt_left_now: self._head_tilt_left_counter = min(self.consec_frames_head_tilt, self._head_tilt_left_counter + 1); self._head_tilt_right_counter = 0
-            elif is_tilt_right_now: self._head_tilt_right_counter = min(self.consec_frames_head_tilt, self._head_tilt_right_counter + 1); self._head_tilt_left_counter = 0
-            else: self._head_tilt_left_counter = max(0, self._head_tilt_left_counter - 1); self._head_tilt_right_counter = max(0, self._head_tilt_right_counter - 1)
-            head_tilt_left_state = self._head_tilt_left_counter >= self.consec_frames_head_tilt
-            head_tilt_right_state = self._head_tilt_right_counter >= self.consec_frames_head_tilt
-
-
-        # --- Event Emission (keep as is) ---
-        if left_eye_blinked and not right_eye_blinked: self.event_handler("face", LEFT_BLINK_EVENT)
-        if right_eye_blinked and not left_eye_blinked: self.event_handler("face", RIGHT_BLINK_EVENT)
-        if mouth_open_state != self._prev_mouth_open_state: self.event_handler("face", MOUTH_OPEN_START_EVENT if mouth_open_state else MOUTH_OPEN_STOP_EVENT); self._prev_mouth_open_state = mouth_open_state
-        if both_eyes_closed_state != self._prev_both_eyes_closed_state: self.event_handler("face", BOTH_EYES_CLOSED_START_EVENT if both_eyes_closed_state else BOTH_EYES_CLOSED_STOP_EVENT); self._prev_both_eyes_closed_state = both_eyes_closed_state
-        if eyebrows_raised_state != self._prev_eyebrows_raised_state: self.event_handler("face", EYEBROWS_RAISED_START_EVENT if eyebrows_raised_state else EYEBROWS_RAISED_STOP_EVENT); self._prev_eyebrows_raised_state = eyebrows_raised_state
-        if head_tilt_left_state != self._prev_head_tilt_left_state: self.event_handler("face", HEAD_TILT_LEFT_START_EVENT if head_tilt_left_state else HEAD_TILT_LEFT_STOP_EVENT); self._prev_head_tilt_left_state = head_tilt_left_state
-        if head_tilt_right_state != self._prev_head_tilt_right_state: self.event_handler("face", HEAD_TILT_RIGHT_START_EVENT if head_tilt_right_state else HEAD_TILT_RIGHT_STOP_EVENT); self._prev_head_tilt_right_state = head_tilt_right_state
+            # One proto -> array copy per frame (needed rows only); all geometry below works on rows of `lm`
+            lm = self._fill_landmarks(landmarks)
+            ear_left_val, ear_right_val, mar_val, avg_err, head_tilt_angle = face_features(
+                lm, self._PAIR_TABLE, self._BROW_EYE_TABLE, self.CHIN_INDEX, self.FOREHEAD_INDEX, frame_width, frame_height)
+            event_mask = update_face_state(ear_left_val, ear_right_val, mar_val, avg_err, head_tilt_angle, current_time,
+                                           self._state, self._int_thresholds, self._float_thresholds)
+        else: st[:] = 0; event_mask = transition_mask(st, self._prev_states) # No face: every state reads as off (counters/timers are left as they were)
+
+        # --- Event Emission: one call per set bit, lowest bit first ---
+        while event_mask:
+            low_bit = event_mask & -event_mask
+            self.event_handler("face", EVENT_BY_BIT[low_bit.bit_length() - 1]); event_mask ^= low_bit
 
 
         # --- Return data needed for visualization by Engine ---
@@ -210,10 +258,10 @@ class FacialDetector:
             "landmark_object": face_landmarks_object,
             # ---------------------------------------------------
             "states": { # Send current calculated states
-                "left_eye_closed": left_eye_closed_state, "right_eye_closed": right_eye_closed_state,
-                "mouth_open": mouth_open_state, "eyebrows_raised": eyebrows_raised_state,
-                "head_tilt_left": head_tilt_left_state, "head_tilt_right": head_tilt_right_state,
-                "both_eyes_closed": both_eyes_closed_state,
+                "left_eye_closed": bool(st[fk.S_LEFT_EYE_CLOSED]), "right_eye_closed": bool(st[fk.S_RIGHT_EYE_CLOSED]),
+                "mouth_open": bool(st[fk.S_MOUTH_OPEN]), "eyebrows_raised": bool(st[fk.S_EYEBROWS_RAISED]),
+                "head_tilt_left": bool(st[fk.S_TILT_LEFT]), "head_tilt_right": bool(st[fk.S_TILT_RIGHT]),
+                "both_eyes_closed": bool(st[fk.S_BOTH_EYES_CLOSED]),
             },
             "values": { # Send calculated values
                 "ear_left": ear_left_val, "ear_right": ear_right_val, "mar": mar_val,
@@ -226,14 +274,23 @@ class FacialDetector:
     def start(self):
         """Initializes MediaPipe models."""
         if self.is_active: print("Facial Detector: Already active."); return
-        print("Facial Detector: Initializing MediaPipe FaceMesh...")
+        self.face_mesh = None
+        if self.backend == "tasks":
+            print(f"Facial Detector: Initializing MediaPipe FaceLandmarker ({'GPU' if self.use_gpu else 'CPU'})...")
+            try: self.face_mesh = _FaceLandmarkerAdapter(self.model_asset_path, self.use_gpu)
+            except Exception as e: print(f"WARN: FaceLandmarker unavailable ({e}); falling back to FaceMesh.")
+        if self.face_mesh is None: print("Facial Detector: Initializing MediaPipe FaceMesh...")
         try:
-            # Initialize face mesh here instead of __init__
-            self.face_mesh = mp_face_mesh.FaceMesh(
-                max_num_faces=1, refine_landmarks=True,
-                min_detection_confidence=0.5, min_tracking_confidence=0.5
-            )
+            if self.face_mesh is None:
+                import mediapipe as mp; mp_face_mesh = mp.solutions.face_mesh # Deferred import (see top of module)
+                # Initialize face mesh here instead of __init__
+                # refine_landmarks adds the iris/lip refinement model (landmarks 468-477); nothing here uses them
+                self.face_mesh = mp_face_mesh.FaceMesh(
+                    static_image_mode=False, max_num_faces=1, refine_landmarks=False,
+                    min_detection_confidence=0.5, min_tracking_confidence=0.5
+                )
             self._reset_states() # Reset states when starting
+            self._prev_thumb = None; self._last_results = None; self._results_age = 0; self._frame_idx = 0
             self.is_active = True
             print("Facial Detector: Started (ready to process frames).")
         except Exception as e:
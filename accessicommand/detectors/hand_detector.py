@@ -1,29 +1,46 @@
 # accessicommand/detectors/hand_detector.py
 import cv2
-import mediapipe as mp
+import numpy as np
+# mediapipe is imported in start(): importing this module (e.g. for the event names) stays cheap
 import time
 import math
 # REMOVED: import threading
 import traceback
+import logging
 
-# --- MediaPipe Setup ---
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
+log = logging.getLogger(__name__)
 
 # --- Default Configuration Constants ---
 DEFAULT_MAX_HANDS = 1
 DEFAULT_DETECTION_CONFIDENCE = 0.7
 DEFAULT_TRACKING_CONFIDENCE = 0.5
 DEFAULT_CONSEC_FRAMES_FOR_GESTURE = 5
+DEFAULT_DETECTION_WIDTH = 480 # Frames wider than this are downscaled before Hands; None/0 disables
+DEFAULT_INFERENCE_STRIDE = 1 # Run Hands on every Nth frame, reusing the last landmarks in between (1 = every frame)
 
 # --- Event Name Constants ---
 OPEN_PALM_EVENT = "OPEN_PALM"; FIST_EVENT = "FIST"; THUMBS_UP_EVENT = "THUMBS_UP"
 POINTING_INDEX_EVENT = "POINTING_INDEX"; VICTORY_EVENT = "VICTORY"
 GESTURE_NONE_EVENT = "HAND_GESTURE_NONE"
 
+# --- Gesture Lookup Table ---
+# A finger is "extended" when its tip is above (smaller y than) its PIP/IP joint and "flexed" when below.
+# Bit i of each mask is finger i (thumb, index, middle, ring, pinky); GESTURE_TABLE[ext | flex << 5]
+# gives the gesture those masks describe, in the same priority order as the original if/elif chain.
+# THUMBS_UP and FIST need one more geometric check in _detect_gesture.
+_THUMB = 1; _INDEX = 2; _MIDDLE = 4; _RING = 8; _PINKY = 16; _ALL_FINGERS = 31
+def _gesture_for_masks(ext, flex):
+    if ext & _THUMB and flex & (_INDEX | _MIDDLE | _RING | _PINKY) == _INDEX | _MIDDLE | _RING | _PINKY: return THUMBS_UP_EVENT
+    if ext & (_INDEX | _MIDDLE) == _INDEX | _MIDDLE and flex & (_RING | _PINKY) == _RING | _PINKY: return VICTORY_EVENT
+    if ext & _INDEX and flex & (_MIDDLE | _RING | _PINKY) == _MIDDLE | _RING | _PINKY: return POINTING_INDEX_EVENT
+    if ext == _ALL_FINGERS: return OPEN_PALM_EVENT
+    if flex == _ALL_FINGERS: return FIST_EVENT
+    return GESTURE_NONE_EVENT
+GESTURE_TABLE = tuple(_gesture_for_masks(key & _ALL_FINGERS, key >> 5) for key in range(1 << 10))
+
 class HandDetector:
-    """ Detects static hand gestures from a frame and emits events. """
+    """ Detects static hand gestures from a frame and emits events.
+    Events are emitted as event_handler("hand", <one of the *_EVENT str constants above>). """
 
     # Landmark IDs
     WRIST = 0; THUMB_CMC = 1; THUMB_MCP = 2; THUMB_IP = 3; THUMB_TIP = 4
@@ -31,12 +48,18 @@ class HandDetector:
     MIDDLE_MCP = 9; MIDDLE_PIP = 10; MIDDLE_DIP = 11; MIDDLE_TIP = 12
     RING_MCP = 13; RING_PIP = 14; RING_DIP = 15; RING_TIP = 16
     PINKY_MCP = 17; PINKY_PIP = 18; PINKY_DIP = 19; PINKY_TIP = 20
+    # Per finger, in GESTURE_TABLE bit order: the tip and the joint it is compared against
+    _TIP_IDX = np.array([THUMB_TIP, INDEX_TIP, MIDDLE_TIP, RING_TIP, PINKY_TIP], dtype=np.intp)
+    _JOINT_IDX = np.array([THUMB_IP, INDEX_PIP, MIDDLE_PIP, RING_PIP, PINKY_PIP], dtype=np.intp)
+    _FINGER_BITS = np.array([_THUMB, _INDEX, _MIDDLE, _RING, _PINKY], dtype=np.int64)
 
     def __init__(self, event_handler,
                  max_num_hands=DEFAULT_MAX_HANDS,
                  min_detection_confidence=DEFAULT_DETECTION_CONFIDENCE,
                  min_tracking_confidence=DEFAULT_TRACKING_CONFIDENCE,
-                 consec_frames_for_gesture=DEFAULT_CONSEC_FRAMES_FOR_GESTURE
+                 consec_frames_for_gesture=DEFAULT_CONSEC_FRAMES_FOR_GESTURE,
+                 detection_width=DEFAULT_DETECTION_WIDTH,
+                 inference_stride=DEFAULT_INFERENCE_STRIDE
                  # REMOVED: camera_index, show_video
                 ):
         self.event_handler = event_handler if callable(event_handler) else self._default_handler
@@ -47,6 +70,9 @@ class HandDetector:
         self.min_detection_confidence = min_detection_confidence
         self.min_tracking_confidence = min_tracking_confidence
         self.consec_frames_for_gesture = consec_frames_for_gesture
+        self.detection_width = detection_width
+        self._small_buf = None # Preallocated downscaled frame for Hands, (re)built when the size changes
+        self.inference_stride = max(1, int(inference_stride or 1)); self._frame_idx = 0; self._last_results = None
 
         # MediaPipe Hands Initialization
         self.hands = None # Initialized in start()
@@ -69,35 +95,48 @@ class HandDetector:
         lm = hand_landmarks.landmark
         if not lm: return GESTURE_NONE_EVENT
         try:
-            thumb_ext = lm[self.THUMB_TIP].y < lm[self.THUMB_IP].y; thumb_flex = lm[self.THUMB_TIP].y > lm[self.THUMB_IP].y
-            index_ext = lm[self.INDEX_TIP].y < lm[self.INDEX_PIP].y; index_flex = lm[self.INDEX_TIP].y > lm[self.INDEX_PIP].y
-            middle_ext= lm[self.MIDDLE_TIP].y < lm[self.MIDDLE_PIP].y; middle_flex= lm[self.MIDDLE_TIP].y > lm[self.MIDDLE_PIP].y
-            ring_ext  = lm[self.RING_TIP].y < lm[self.RING_PIP].y; ring_flex = lm[self.RING_TIP].y > lm[self.RING_PIP].y
-            pinky_ext = lm[self.PINKY_TIP].y < lm[self.PINKY_PIP].y; pinky_flex= lm[self.PINKY_TIP].y > lm[self.PINKY_PIP].y
-
-            if thumb_ext and index_flex and middle_flex and ring_flex and pinky_flex and \
-               lm[self.THUMB_TIP].y < lm[self.INDEX_PIP].y and lm[self.THUMB_TIP].y < lm[self.MIDDLE_PIP].y: return THUMBS_UP_EVENT
-            elif index_ext and middle_ext and ring_flex and pinky_flex: return VICTORY_EVENT
-            elif index_ext and middle_flex and ring_flex and pinky_flex: return POINTING_INDEX_EVENT
-            elif thumb_ext and index_ext and middle_ext and ring_ext and pinky_ext: return OPEN_PALM_EVENT
-            elif thumb_flex and index_flex and middle_flex and ring_flex and pinky_flex:
-                 palm_cy = lm[self.MIDDLE_MCP].y
-                 tips_near = (lm[self.INDEX_TIP].y > palm_cy and lm[self.MIDDLE_TIP].y > palm_cy and \
-                              lm[self.RING_TIP].y > palm_cy and lm[self.PINKY_TIP].y > palm_cy)
-                 if tips_near: return FIST_EVENT
-            return GESTURE_NONE_EVENT
-        except IndexError: print("WARN: Hand landmark index error."); return GESTURE_NONE_EVENT
-        except Exception as e: print(f"ERROR: Gesture detection: {e}"); traceback.print_exc(); return GESTURE_NONE_EVENT
+            # Every rule only compares heights, so one pass pulls all y values into an array
+            ys = np.fromiter((p.y for p in lm), dtype=np.float64, count=len(lm))
+            tip_y = ys[self._TIP_IDX]; joint_y = ys[self._JOINT_IDX]
+            ext = int(self._FINGER_BITS[tip_y < joint_y].sum()); flex = int(self._FINGER_BITS[tip_y > joint_y].sum())
+            gesture = GESTURE_TABLE[ext | flex << 5]
+            if gesture == THUMBS_UP_EVENT: # Thumb tip must also clear the index and middle PIP joints
+                if not (tip_y[0] < joint_y[1] and tip_y[0] < joint_y[2]): return GESTURE_NONE_EVENT
+            elif gesture == FIST_EVENT: # Curled fingertips must sit below the palm centre
+                if not (tip_y[1:] > ys[self.MIDDLE_MCP]).all(): return GESTURE_NONE_EVENT
+            return gesture
+        except IndexError: log.warning("WARN: Hand landmark index error."); return GESTURE_NONE_EVENT
+        except Exception as e: log.exception("ERROR: Gesture detection: %s", e); return GESTURE_NONE_EVENT
+
+    def _run_hands(self, frame):
+        """ Runs Hands on the (optionally downscaled) RGB frame and returns its results. """
+        # Assumes frame is already flipped and in RGB from Engine
+        # Palm/landmark models run at ~200px internally and landmarks are normalized, so a downscaled
+        # input gives the same gestures for a fraction of the resize/convert work
+        detect_frame = frame; frame_height, frame_width = frame.shape[:2]
+        if self.detection_width and frame_width > self.detection_width:
+            small_h = int(frame_height * self.detection_width / frame_width)
+            if self._small_buf is None or self._small_buf.shape[:2] != (small_h, self.detection_width):
+                self._small_buf = np.empty((small_h, self.detection_width, 3), dtype=frame.dtype)
+            detect_frame = cv2.resize(frame, (self.detection_width, small_h), dst=self._small_buf, interpolation=cv2.INTER_AREA)
+        # Only our own resize buffer is toggled (read-only lets MediaPipe skip a copy); a frame passed in
+        # as-is belongs to the caller, which hands it over read-only already (see Engine._run_main_loop)
+        if detect_frame is frame: return self.hands.process(detect_frame)
+        detect_frame.flags.writeable = False
+        results = self.hands.process(detect_frame)
+        detect_frame.flags.writeable = True
+        return results
 
     def process_frame(self, frame, frame_timestamp):
         """ Processes a single frame for hand gestures. """
         if not self.is_active or self.hands is None:
             return None # No landmarks to return if inactive
 
-        # Assumes frame is already flipped and in RGB from Engine
-        frame.flags.writeable = False
-        results = self.hands.process(frame)
-        frame.flags.writeable = True
+        # Strided frames reuse the last landmarks; the debounce counter still advances once per frame
+        if self._last_results is not None and self._frame_idx % self.inference_stride:
+            self._frame_idx += 1; results = self._last_results
+        else:
+            self._frame_idx += 1; results = self._last_results = self._run_hands(frame)
 
         detected_gesture_this_frame = GESTURE_NONE_EVENT
         hand_landmarks_for_vis = None
@@ -109,7 +148,11 @@ class HandDetector:
             detected_gesture_this_frame = self._detect_gesture(hand_landmarks)
 
         # --- Debounce and Emit Events ---
-        if detected_gesture_this_frame == self._last_detected_gesture: self._gesture_counter += 1
+        # The counter saturates at consec_frames_for_gesture (only ">= threshold" and "== 0" are ever tested);
+        # once saturated on the already-emitted gesture nothing below can change, so return early
+        if detected_gesture_this_frame == self._last_detected_gesture:
+            if self._gesture_counter < self.consec_frames_for_gesture: self._gesture_counter += 1
+            elif detected_gesture_this_frame == self._current_stable_gesture: return hand_landmarks_for_vis
         else: self._gesture_counter = 0; self._last_detected_gesture = detected_gesture_this_frame
 
         is_stable = self._gesture_counter >= self.consec_frames_for_gesture
@@ -120,10 +163,10 @@ class HandDetector:
            (self._gesture_counter == 0 and detected_gesture_this_frame == GESTURE_NONE_EVENT and self._current_stable_gesture != GESTURE_NONE_EVENT):
             old_stable = self._current_stable_gesture
             self._current_stable_gesture = new_stable_gesture if is_stable else GESTURE_NONE_EVENT
-            print(f"Hand Detector: Stable gesture changed: {old_stable} -> {self._current_stable_gesture}")
+            log.debug("Hand Detector: Stable gesture changed: %s -> %s", old_stable, self._current_stable_gesture)
             try:
                 self.event_handler("hand", self._current_stable_gesture)
-            except Exception as handler_e: print(f"ERROR: Hand event handler: {handler_e}"); traceback.print_exc()
+            except Exception as handler_e: log.exception("ERROR: Hand event handler: %s", handler_e)
 
         # Return landmarks for potential drawing by Engine
         return hand_landmarks_for_vis # Or results.multi_hand_landmarks if multi-hand
@@ -133,11 +176,12 @@ class HandDetector:
         if self.is_active: print("Hand Detector: Already active."); return
         print("Hand Detector: Initializing MediaPipe Hands...")
         try:
+            import mediapipe as mp; mp_hands = mp.solutions.hands # Deferred import (see top of module)
             self.hands = mp_hands.Hands(
                 static_image_mode=False, max_num_hands=self.max_num_hands,
                 min_detection_confidence=self.min_detection_confidence,
                 min_tracking_confidence=self.min_tracking_confidence)
-            self._reset_states()
+            self._reset_states(); self._frame_idx = 0; self._last_results = None
             self.is_active = True
             print("Hand Detector: Started (ready to process frames).")
         except Exception as e:
@@ -1,18 +1,41 @@
 # accessicommand/detectors/voice_detector.py
 import speech_recognition as sr
+import numpy as np
+import os
 import threading
+import queue
+import collections
 import time
-import traceback
+import logging
+import re
+try: from faster_whisper import WhisperModel # Optional: CTranslate2 Whisper with int8 kernels, much faster on CPU
+except ImportError: WhisperModel = None
+try: import webrtcvad # Optional: C speech/non-speech classifier used for phrase endpointing instead of energy RMS
+except ImportError: webrtcvad = None
+
+log = logging.getLogger(__name__)
 
 # --- Constants ---
 DEFAULT_PAUSE_THRESHOLD = 0.5 # Default pause threshold
 DEFAULT_ENERGY_THRESHOLD = 350
 PHRASE_TIME_LIMIT = 5 # Allow slightly longer phrases for UI commands
+LISTEN_TIMEOUT = 1 # Seconds listen() waits for speech onset before re-checking self.running (the mic stays open)
+TRANSCRIBE_QUEUE_SIZE = 4 # Phrases waiting for Whisper; further ones are dropped rather than lagging ever further behind
 WHISPER_MODEL_SIZE = "tiny.en"
+WHISPER_COMPUTE_TYPE = "int8" # faster-whisper only; falls back to recognizer.recognize_whisper (FP32) when not installed
+WHISPER_SAMPLE_RATE = 16000
+# WebRTC VAD endpointing (only when webrtcvad is installed): the mic is opened at 16 kHz in 20 ms chunks,
+# since the VAD accepts only 10/20/30 ms frames at 8/16/32/48 kHz
+VAD_AGGRESSIVENESS = 2 # 0 (least) .. 3 (most aggressive at rejecting non-speech)
+VAD_FRAME_MS = 20
+VAD_FRAME_SAMPLES = WHISPER_SAMPLE_RATE * VAD_FRAME_MS // 1000
+VAD_PREROLL_MS = 300 # Audio kept from before speech onset so the first syllable isn't clipped
 
 # --- Define UI Command Keywords (Hardcoded here for now) ---
 # These are words that, if present, suggest the command is for the UI
-UI_KEYWORDS = {"start", "stop", "config", "configuration", "settings", "bindings", "open", "click", "press", "engine", "window", "gui", "ui"}
+UI_KEYWORDS = frozenset({"start", "stop", "config", "configuration", "settings", "bindings", "open", "click", "press", "engine", "window", "gui", "ui"})
+_UI_KEYWORDS_SORTED = sorted(UI_KEYWORDS) # For logging only
+_WORD_PUNCTUATION = ".,!?\"'" # Stripped from both ends of each transcribed word
 
 class VoiceDetector:
     """
@@ -24,154 +47,266 @@ class VoiceDetector:
                  system_trigger_words, # Words for system actions bindings
                  energy_threshold=DEFAULT_ENERGY_THRESHOLD,
                  pause_threshold=DEFAULT_PAUSE_THRESHOLD,
-                 device_index=None):
+                 device_index=None,
+                 ui_enabled=True):
         """
         Initializes the VoiceDetector.
 
         Args:
             event_handler (callable): Function for emitting events.
-                                      Signature: event_handler(type: str, data: any)
+                                      Signature: event_handler(type: str, data: str)
                                       Types: "voice" (system trigger), "ui_command" (raw phrase)
-            system_trigger_words (list | set): Lowercase words/phrases for system bindings.
+                                      Data is always an already-lowercased str.
+            system_trigger_words (list | set | frozenset): Lowercase words/phrases for system bindings.
+                                      A frozenset is taken as already normalized and kept as-is.
             energy_threshold (int): Mic sensitivity.
             pause_threshold (float): Silence duration to end phrase.
             device_index (int | None): Mic index.
+            ui_enabled (bool): Route phrases containing UI_KEYWORDS as "ui_command". When False only
+                                      system triggers are matched (e.g. no GUI to receive UI commands).
         """
         # --- Initialization Logging ---
         print("[VD LOG] Initializing VoiceDetector...")
         self.recognizer = sr.Recognizer()
-        mic_init_success = False
+        self._vad = webrtcvad.Vad(VAD_AGGRESSIVENESS) if webrtcvad is not None else None
+        mic_kwargs = {'sample_rate': WHISPER_SAMPLE_RATE, 'chunk_size': VAD_FRAME_SAMPLES} if self._vad else {}
+        print(f"[VD LOG] Phrase endpointing: {'WebRTC VAD' if self._vad else 'energy threshold'}")
+        mic_init_success = False; self._device_index = device_index
         try:
             print(f"[VD LOG] Attempting mic index: {device_index}")
-            self.microphone = sr.Microphone(device_index=device_index)
+            self.microphone = sr.Microphone(device_index=device_index, **mic_kwargs)
             mic_init_success = True; print("[VD LOG] Microphone initialized.")
         except Exception as e:
             print(f"ERROR: Mic init failed (idx: {device_index}): {e}. Using default.")
-            try: self.microphone = sr.Microphone(); mic_init_success = True; print("[VD LOG] Default microphone initialized.")
+            try: self.microphone = sr.Microphone(**mic_kwargs); mic_init_success = True; print("[VD LOG] Default microphone initialized.")
             except Exception as e_default: print(f"ERROR: Default mic init failed: {e_default}"); self.microphone = None
 
         self.running = False; self.thread = None; self._is_listening = False
+        self._audio_queue = None; self._transcribe_thread = None # Whisper runs off the listening thread (see _transcribe_loop)
 
         if not callable(event_handler): print("WARN [VD]: No valid event_handler. Events not emitted."); self.event_handler = lambda d, e: None
         else: self.event_handler = event_handler; print("[VD LOG] Event handler registered.")
 
         # Store SYSTEM trigger words
-        self.system_trigger_words = set(str(word).lower() for word in system_trigger_words if isinstance(word, str) and word)
+        if isinstance(system_trigger_words, frozenset): self.system_trigger_words = system_trigger_words
+        else: self.system_trigger_words = frozenset(str(word).lower() for word in system_trigger_words if isinstance(word, str) and word)
         if not self.system_trigger_words: print("WARN [VD]: No system trigger words provided.")
-        else: print(f"[VD LOG] System Triggers: {sorted(list(self.system_trigger_words))}")
+        else: print(f"[VD LOG] System Triggers: {sorted(self.system_trigger_words)}")
+        # All triggers compiled into one alternation, so one finditer() pass finds them in spoken order; longest
+        # first so "next slide" wins over "next", and multi-word triggers match too. It runs over the punctuation-stripped
+        # words joined by single spaces, and the lookarounds only accept whole tokens: "'next'" matches "next",
+        # "next's" and "re-start" match nothing (same tokens as comparing each stripped word against the set)
+        self._trigger_re = re.compile(r"(?<!\S)(?:" + "|".join(map(re.escape, sorted(self.system_trigger_words, key=len, reverse=True))) + r")(?!\S)") \
+            if self.system_trigger_words else None
+        self.ui_enabled = ui_enabled
 
         # Log UI Keywords
-        print(f"[VD LOG] UI Keywords: {sorted(list(UI_KEYWORDS))}")
+        print(f"[VD LOG] UI Keywords: {_UI_KEYWORDS_SORTED if ui_enabled else 'disabled'}")
 
         # Apply recognizer settings
         self.recognizer.energy_threshold = energy_threshold; self.recognizer.pause_threshold = pause_threshold
         self.recognizer.non_speaking_duration = pause_threshold; self.recognizer.dynamic_energy_threshold = True
         print(f"[VD LOG] Recognizer settings: energy={energy_threshold}, pause={pause_threshold}, non_speak={pause_threshold}, dynamic=True")
 
+        # Whisper backend: the recognizer is still used for listen(), only transcription moves to faster-whisper
+        self._fw_model = None
+        if WhisperModel is not None:
+            try:
+                self._fw_model = WhisperModel(WHISPER_MODEL_SIZE, device="cpu", compute_type=WHISPER_COMPUTE_TYPE, cpu_threads=max(1, (os.cpu_count() or 2) // 2))
+                print(f"[VD LOG] faster-whisper model loaded ({WHISPER_MODEL_SIZE}, {WHISPER_COMPUTE_TYPE}).")
+            except Exception as e: print(f"WARN [VD]: faster-whisper load failed: {e}. Using speech_recognition Whisper.")
+        else: print("[VD LOG] faster-whisper not installed. Using speech_recognition Whisper.")
+
         # Ambient noise adjustment
         if mic_init_success:
             print("[VD LOG] Adjusting for ambient noise...")
             try:
-                with self.microphone as source: self.recognizer.adjust_for_ambient_noise(source, duration=1)
+                try:
+                    with self.microphone as source: self.recognizer.adjust_for_ambient_noise(source, duration=1)
+                except OSError as e: # Most likely the device can't record at the VAD's 16 kHz
+                    if self._vad is None: raise
+                    self._disable_vad(e)
+                    with self.microphone as source: self.recognizer.adjust_for_ambient_noise(source, duration=1)
                 print(f"[VD LOG] Ambient noise adjusted. Energy threshold: {self.recognizer.energy_threshold:.2f}")
             except Exception as e: print(f"WARN [VD]: Adjust ambient noise failed: {e}.")
         else: print("WARN [VD]: Skipping ambient noise adjustment.")
+        self._warm_up_whisper()
         print("--- Voice Detector Initialized ---")
         # --- End Initialization Logging ---
 
+    def _warm_up_whisper(self):
+        """ Loads (and runs once) the Whisper model now, so the first real phrase isn't delayed by it. """
+        # recognize_whisper imports whisper and loads the weights on first use; faster-whisper's first
+        # transcribe() pays its own one-off setup. One second of silence triggers both.
+        print("[VD LOG] Warming up Whisper...")
+        start = time.monotonic()
+        try: self._transcribe(sr.AudioData(b"\x00\x00" * WHISPER_SAMPLE_RATE, WHISPER_SAMPLE_RATE, 2))
+        except sr.UnknownValueError: pass
+        except Exception as e: print(f"WARN [VD]: Whisper warm-up failed: {e}"); return
+        print(f"[VD LOG] Whisper ready ({time.monotonic() - start:.2f}s).")
+
+    def _transcribe(self, audio_data):
+        """ Returns the raw transcription of an sr.AudioData clip. """
+        if self._fw_model is None:
+            return self.recognizer.recognize_whisper(audio_data, model=WHISPER_MODEL_SIZE, language="english")
+        # 16 kHz mono float32 in [-1, 1) is what faster-whisper expects for an in-memory array
+        samples = np.frombuffer(audio_data.get_raw_data(convert_rate=WHISPER_SAMPLE_RATE, convert_width=2), dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = self._fw_model.transcribe(samples, language="en", beam_size=1, vad_filter=False)
+        return "".join(segment.text for segment in segments)
+
     # --- ADDED BACK UI COMMAND LOGIC ---
     def _process_speech(self, audio_data):
         """ Processes audio, checks for UI keywords OR system triggers. """
-        print("[VD LOG] Processing received audio data...")
+        # Runs once per phrase on the listening thread: logging is level-gated and %-formatted lazily
+        debug = log.isEnabledFor(logging.DEBUG)
+        if debug: log.debug("[VD LOG] Processing received audio data (Whisper model: %s)...", WHISPER_MODEL_SIZE)
         try:
-            print(f"[VD LOG] Transcribing using Whisper model: {WHISPER_MODEL_SIZE}...")
-            recognized_text = self.recognizer.recognize_whisper(
-                audio_data, model=WHISPER_MODEL_SIZE, language="english"
-            ).lower()
+            recognized_text = self._transcribe(audio_data).lower()
             cleaned_text = recognized_text.strip(" .,!?\"'\n\t")
-            # Use a set of words for efficient checking
-            words_set = set(cleaned_text.split())
+            words = [word for word in (raw.strip(_WORD_PUNCTUATION) for raw in cleaned_text.split()) if word]
 
-            if not words_set: print("[VD LOG] Transcription empty."); return
+            if not words: log.debug("[VD LOG] Transcription empty."); return
 
-            print(f"[VD LOG] Heard: '{cleaned_text}' (Word set: {words_set})")
+            log.info("[VD LOG] Heard: '%s'", cleaned_text)
 
             # --- Check for UI Keywords ---
-            found_ui_keywords = words_set.intersection(UI_KEYWORDS)
-            if found_ui_keywords:
-                print(f"[VD LOG] Detected UI keywords: {found_ui_keywords}. Emitting full phrase as 'ui_command'.")
-                try:
-                    print(f"[VD LOG] Calling event handler: type='ui_command', data='{cleaned_text}'")
-                    self.event_handler("ui_command", cleaned_text) # Send the whole phrase
-                    print("[VD LOG] Event handler call completed for ui_command.")
-                except Exception as handler_e: print(f"ERROR [VD]: UI event handler failed: {handler_e}"); traceback.print_exc()
+            if self.ui_enabled and not UI_KEYWORDS.isdisjoint(words):
+                if debug: log.debug("[VD LOG] Detected UI keywords: %s. Emitting full phrase as 'ui_command'.", UI_KEYWORDS.intersection(words))
+                try: self.event_handler("ui_command", cleaned_text) # Send the whole phrase
+                except Exception as handler_e: log.exception("ERROR [VD]: UI event handler failed: %s", handler_e)
                 # --- IMPORTANT: Return after handling UI command to prevent system trigger check ---
                 return
-            else:
-                print("[VD LOG] No UI keywords found in phrase.")
 
             # --- Check for System Trigger Words (only if no UI keywords found) ---
             processed_system_trigger = False
-            # Use the original split order if needed, but set check is fine for individual words
-            for word in cleaned_text.split(): # Iterate original order
-                 cleaned_word = word.strip(".,!?\"'") # Clean individual word
-                 if not cleaned_word: continue
-
-                 if cleaned_word in self.system_trigger_words:
-                     trigger_found_in_phrase = True # Flag that at least one trigger was found
-                     print(f"[VD LOG] System trigger detected: '{cleaned_word}'")
-                     try:
-                         print(f"[VD LOG] Calling event handler: type='voice', data='{cleaned_word}'")
-                         self.event_handler("voice", cleaned_word) # Emit specific trigger word
-                         print(f"[VD LOG] Event handler call completed for '{cleaned_word}'.")
-                         processed_system_trigger = True
-                         # Decide: Process all triggers in phrase or just the first? Processing all now.
-                     except Exception as handler_e: print(f"ERROR [VD]: System event handler failed for '{cleaned_word}': {handler_e}"); traceback.print_exc()
-
-            if not processed_system_trigger:
-                 print(f"[VD LOG] No registered system trigger words found in '{cleaned_text}'.")
-
-        except sr.UnknownValueError: print("[VD LOG] Whisper could not understand audio.")
-        except sr.RequestError as e: print(f"ERROR [VD]: RequestError: {e}")
-        except Exception as e: print(f"ERROR [VD]: Recognition/Processing: {e}"); traceback.print_exc()
-        finally: print("[VD LOG] Finished processing audio data.")
+            for match in (self._trigger_re.finditer(" ".join(words)) if self._trigger_re is not None else ()):
+                cleaned_word = match.group(0)
+                log.info("[VD LOG] System trigger detected: '%s'", cleaned_word)
+                try:
+                    self.event_handler("voice", cleaned_word) # Emit specific trigger word
+                    processed_system_trigger = True
+                    # Decide: Process all triggers in phrase or just the first? Processing all now.
+                except Exception as handler_e: log.exception("ERROR [VD]: System event handler failed for '%s': %s", cleaned_word, handler_e)
+
+            if not processed_system_trigger and debug:
+                 log.debug("[VD LOG] No registered system trigger words found in '%s'.", cleaned_text)
+
+        except sr.UnknownValueError: pass # Unintelligible audio is routine (noise, coughs), not an error
+        except sr.RequestError as e: log.error("ERROR [VD]: RequestError: %s", e)
+        except Exception as e: log.exception("ERROR [VD]: Recognition/Processing: %s", e)
     # --- END UPDATED METHOD ---
 
 
     def _listen_loop(self):
         """ The core listening loop. """
-        print("[VD LOG] Background listening thread started.")
-        if self.microphone is None: print("ERROR [VD]: Mic uninitialized."); self.running = False; return
+        log.debug("[VD LOG] Background listening thread started.")
+        if self.microphone is None: log.error("ERROR [VD]: Mic uninitialized."); self.running = False; return
 
+        # The PyAudio stream is opened once and reused for every phrase (reopening it per listen() re-runs the
+        # PortAudio/ALSA setup each time); it is only reopened after a mic OSError
+        source = None
+        try:
+            while self.running:
+                audio_data = None
+                self._is_listening = True
+                try:
+                    if source is None:
+                        try: source = self.microphone.__enter__()
+                        except OSError as e:
+                            if self._vad is None: raise
+                            self._disable_vad(e); continue # Retry right away at the device's own rate
+                    if self._vad is not None: audio_data = self._listen_vad(source)
+                    else: audio_data = self.recognizer.listen(source, timeout=LISTEN_TIMEOUT, phrase_time_limit=PHRASE_TIME_LIMIT)
+                    self._is_listening = False
+
+                    if audio_data and self.running:
+                         self._enqueue_audio(audio_data)
+
+                except sr.WaitTimeoutError: self._is_listening = False; continue
+                except OSError as e: log.error("ERROR [VD] Mic OS Error: %s", e); source = self._close_source(source); time.sleep(2); self._is_listening = False
+                except Exception as e: log.exception("ERROR [VD] Listen loop: %s", e); time.sleep(1); self._is_listening = False
+        finally: self._close_source(source)
+        log.debug("[VD LOG] Background listening thread finished.")
+
+    def _disable_vad(self, error):
+        """ Falls back to energy-threshold endpointing with a default-rate mic (the 16 kHz VAD stream failed to open). """
+        log.warning("WARN [VD]: Mic can't open at %d Hz for VAD (%s); using energy threshold endpointing.", WHISPER_SAMPLE_RATE, error)
+        self._vad = None
+        try: self.microphone = sr.Microphone(device_index=self._device_index)
+        except Exception as e: log.warning("WARN [VD]: Mic re-init failed (idx: %s): %s. Using default.", self._device_index, e); self.microphone = sr.Microphone()
+
+    def _listen_vad(self, source):
+        """ Records one phrase from the open mic, endpointed by WebRTC VAD; returns sr.AudioData (None once stopped). """
+        # Same contract as recognizer.listen: starts at speech onset, ends after pause_threshold of
+        # non-speech or at PHRASE_TIME_LIMIT. Checking self.running per 20 ms frame also makes stop() prompt.
+        read = source.stream.read; chunk = source.CHUNK; sample_rate = source.SAMPLE_RATE; is_speech = self._vad.is_speech
+        silence_limit = max(1, int(self.recognizer.pause_threshold * 1000) // VAD_FRAME_MS)
+        max_frames = PHRASE_TIME_LIMIT * 1000 // VAD_FRAME_MS
+        preroll = collections.deque(maxlen=VAD_PREROLL_MS // VAD_FRAME_MS)
+        frames = None; silent = 0
         while self.running:
-            audio_data = None
-            if not self.running: print("[VD LOG] Exiting listen loop."); break
-            # print("[VD LOG] Listening...") # Very noisy log
-            self._is_listening = True
-            try:
-                with self.microphone as source:
-                    audio_data = self.recognizer.listen(source, timeout=None, phrase_time_limit=PHRASE_TIME_LIMIT)
-                self._is_listening = False
-                # print("[VD LOG] Speech detected/timeout.") # Noisy
+            buffer = read(chunk)
+            if frames is None: # Waiting for speech onset
+                if is_speech(buffer, sample_rate): frames = list(preroll); frames.append(buffer)
+                else: preroll.append(buffer)
+                continue
+            frames.append(buffer)
+            silent = 0 if is_speech(buffer, sample_rate) else silent + 1
+            if silent >= silence_limit or len(frames) >= max_frames: break
+        if not frames or not self.running: return None
+        return sr.AudioData(b"".join(frames), sample_rate, source.SAMPLE_WIDTH)
+
+    def _enqueue_audio(self, audio_data):
+        """ Hands a captured phrase to the transcription thread without blocking the mic. """
+        try: self._audio_queue.put_nowait(audio_data)
+        except queue.Full: log.warning("WARN [VD]: Transcription backlog full; dropping phrase.")
 
-                if audio_data and self.running:
-                     self._process_speech(audio_data)
-                # else: print("[VD LOG] No audio data received from listen.") # Noisy
+    def _transcribe_loop(self):
+        """ Transcribes queued phrases so listen() can keep draining the mic meanwhile. """
+        # A thread is enough: Whisper inference (CTranslate2 / PyTorch) releases the GIL while it runs
+        audio_queue = self._audio_queue
+        while True:
+            audio_data = audio_queue.get()
+            if audio_data is None: break # Sentinel from stop()
+            if self.running: self._process_speech(audio_data)
+        log.debug("[VD LOG] Transcription thread finished.")
 
-            except sr.WaitTimeoutError: self._is_listening = False; continue
-            except OSError as e: print(f"ERROR [VD] Mic OS Error: {e}"); time.sleep(2); self._is_listening = False
-            except Exception as e: print(f"ERROR [VD] Listen loop: {e}"); traceback.print_exc(); time.sleep(1); self._is_listening = False
-        print("[VD LOG] Background listening thread finished.")
+    def _close_source(self, source):
+        """ Closes the mic stream opened by _listen_loop (if any); returns None for the caller to store. """
+        if source is not None:
+            try: self.microphone.__exit__(None, None, None)
+            except Exception as e: log.warning("WARN [VD]: Closing mic stream failed: %s", e)
+        return None
 
     def start(self):
         """ Starts the listening thread. """
         if self.running: print("[VD LOG] Already running."); return
         if self.microphone is None: print("ERROR [VD]: Cannot start - mic uninitialized."); return
+        # A listener that outlived the last stop() still holds the open mic; two threads can't share it
+        if self.thread and self.thread.is_alive():
+            print("[VD LOG] Waiting for previous listening thread to exit..."); self.thread.join(timeout=PHRASE_TIME_LIMIT + LISTEN_TIMEOUT)
+            if self.thread.is_alive(): print("ERROR [VD]: Previous listening thread still running; not starting."); return
         print("--- Voice Detector Starting ---"); self.running = True
+        self._audio_queue = queue.Queue(maxsize=TRANSCRIBE_QUEUE_SIZE)
+        self._transcribe_thread = threading.Thread(target=self._transcribe_loop, daemon=True); self._transcribe_thread.start()
         self.thread = threading.Thread(target=self._listen_loop, daemon=True)
         self.thread.start()
         if self.thread.is_alive(): print("[VD LOG] Voice Detector started successfully.")
-        else: print("ERROR [VD]: Failed to start thread."); self.running = False
+        else: print("ERROR [VD]: Failed to start thread."); self.running = False; self._stop_transcriber(1.0)
+
+    def _stop_transcriber(self, timeout):
+        """ Wakes the transcription thread with the stop sentinel and waits for it briefly. """
+        if self._transcribe_thread is None: return
+        # Queued phrases are skipped once running is False, so dropping one to make room costs nothing; a full
+        # queue must never cost the sentinel (the worker would block in get() forever)
+        while True:
+            try: self._audio_queue.put_nowait(None); break
+            except queue.Full:
+                try: self._audio_queue.get_nowait()
+                except queue.Empty: pass
+        self._transcribe_thread.join(timeout=timeout)
+        if self._transcribe_thread.is_alive(): print("WARN [VD]: Transcription thread still busy; it exits after the current phrase.")
+        self._transcribe_thread = None
 
     def stop(self):
         """ Stops the listening thread. """
@@ -181,6 +316,8 @@ class VoiceDetector:
             print("[VD LOG] Waiting for thread join..."); join_timeout = max(self.recognizer.pause_threshold*2, 1.5); self.thread.join(timeout=join_timeout)
             if self.thread.is_alive(): print("WARN [VD]: Thread join timeout.")
             else: print("[VD LOG] Thread joined.")
-        self.thread = None; print("[VD LOG] Voice Detector stopped.")
+        self._stop_transcriber(max(self.recognizer.pause_threshold*2, 1.5))
+        if not (self.thread and self.thread.is_alive()): self.thread = None # A still-running listener is kept so start() can wait for it
+        print("[VD LOG] Voice Detector stopped.")
 
 # Removed __main__ block
\ No newline at end of file
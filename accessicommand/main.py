@@ -1,6 +1,6 @@
 # accessicommand/main.py
 import tkinter as tk
-import os, sys, traceback
+import os, sys, traceback, logging
 
 # Adjust path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -31,6 +31,8 @@ def shutdown_application():
     print("--- AccessiCommand Finished ---")
 
 if __name__ == "__main__":
+    # Engine event dispatch logs through `logging`; DEBUG shows every event and action
+    logging.basicConfig(level=logging.DEBUG if os.environ.get("ACCESSICOMMAND_DEBUG") else logging.INFO, format="%(message)s")
     print("--- Starting AccessiCommand Application ---")
     config_file_path = os.path.join(project_root, "config.json")
     print(f"Using configuration file: {config_file_path}")
@@ -2,6 +2,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, font # Import font
 import traceback
+import os
+
+_DEBUG = bool(os.environ.get("ACCESSICOMMAND_DEBUG")) # Verbose dialog tracing; off by default
 
 # --- Imports ---
 try:
@@ -103,7 +106,7 @@ class ConfigDialog:
             # Set border to 0 to avoid potential white border on dropdown list
             self.top.option_add('*TCombobox*Listbox.borderWidth', 0)
             self.top.option_add('*TCombobox*Listbox.highlightThickness', 0) # Try removing highlight border too
-            print("DEBUG: Applied Tkinter Listbox options for Combobox dropdown.")
+            if _DEBUG: print("DEBUG: Applied Tkinter Listbox options for Combobox dropdown.")
         except tk.TclError as e: print(f"WARN: Could not set Tkinter Listbox options: {e}")
         # --- End Styling Corrections ---
 
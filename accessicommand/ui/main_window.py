@@ -7,6 +7,9 @@ try:
     _config_dialog_imported = True
 except ImportError: print("ERROR importing ConfigDialog"); _config_dialog_imported = False
 import sys # For exiting application (optional)
+import os
+
+_DEBUG = bool(os.environ.get("ACCESSICOMMAND_DEBUG")) # Verbose GUI tracing; off by default
 
 class AppGUI:
     """ Main application window using Tkinter. """
@@ -89,12 +92,12 @@ class AppGUI:
             start_state = str(self.start_button.cget('state')) # Get state as string for reliable comparison
             stop_state = str(self.stop_button.cget('state'))
             config_state = str(self.config_button.cget('state'))
-            print(f"DEBUG GUI: Matching '{command}'. Btn States: Start={start_state}, Stop={stop_state}, Config={config_state}") # Log states
+            if _DEBUG: print(f"DEBUG GUI: Matching '{command}'. Btn States: Start={start_state}, Stop={stop_state}, Config={config_state}") # Log states
 
             # --- Check for START command ---
             # Only invoke if start button is currently enabled ('normal')
             if ("start" in command or "run" in command or "activate" in command):
-                print(f"DEBUG GUI: Checking START condition. Start state is '{start_state}'.") # Explicit check
+                if _DEBUG: print(f"DEBUG GUI: Checking START condition. Start state is '{start_state}'.") # Explicit check
                 if start_state == tk.NORMAL:
                     print("GUI Action: Invoking Start Button via voice")
                     self.start_button.invoke() # Simulate button click
@@ -105,7 +108,7 @@ class AppGUI:
             # --- Check for STOP command ---
             # Only invoke if stop button is currently enabled ('normal')
             elif ("stop" in command or "pause" in command or "halt" in command):
-                print(f"DEBUG GUI: Checking STOP condition. Stop state is '{stop_state}'.") # Explicit check
+                if _DEBUG: print(f"DEBUG GUI: Checking STOP condition. Stop state is '{stop_state}'.") # Explicit check
                 if stop_state == tk.NORMAL:
                     print("GUI Action: Invoking Stop Button via voice")
                     self.stop_button.invoke()
@@ -116,7 +119,7 @@ class AppGUI:
             # --- Check for CONFIG command ---
             # Only invoke if config button is currently enabled ('normal')
             elif ("config" in command or "setting" in command or "binding" in command or "option" in command):
-                 print(f"DEBUG GUI: Checking CONFIG condition. Config state is '{config_state}'.") # Explicit check
+                 if _DEBUG: print(f"DEBUG GUI: Checking CONFIG condition. Config state is '{config_state}'.") # Explicit check
                  if config_state == tk.NORMAL:
                      print("GUI Action: Invoking Configure Button via voice")
                      self.config_button.invoke()